@@ -2,7 +2,7 @@ from __future__ import annotations
 
 from functools import lru_cache
 from pathlib import Path
-from typing import Optional
+from typing import List, Optional
 
 from pydantic import BaseModel, BaseSettings, Field
 
@@ -22,6 +22,10 @@ class ModelPaths(BaseModel):
         default=Path("models/silero_vad/silero_vad.onnx"),
         description="Path to the Silero VAD ONNX model file.",
     )
+    checksum_manifest: Optional[Path] = Field(
+        default=None,
+        description="Optional JSON manifest mapping resource names to SHA-256 digests.",
+    )
 
 
 class Settings(BaseSettings):
@@ -33,11 +37,19 @@ class Settings(BaseSettings):
         description="Directory where uploaded audio files will be stored.",
     )
     models: ModelPaths = Field(default_factory=ModelPaths)
+    model_download_connections: int = Field(
+        default=4,
+        description="Number of parallel HTTP range requests used per model download.",
+    )
     sample_rate: int = Field(default=16000, description="Target sample rate for ASR input.")
     max_segment_seconds: float = Field(
         default=30.0,
         description="Maximum duration for each segment processed by the ASR.",
     )
+    inference_bucket_seconds: List[float] = Field(
+        default_factory=lambda: [2.0, 5.0, 10.0, 20.0, 30.0],
+        description="Padded segment lengths used to keep ASR input shapes stable.",
+    )
     vad_threshold: float = Field(
         default=0.4,
         description="Default probability threshold for the Silero VAD model.",
@@ -50,6 +62,41 @@ class Settings(BaseSettings):
         default=0.5,
         description="Minimum silence duration required to split speech segments.",
     )
+    capture_buffer_seconds: float = Field(
+        default=60.0,
+        description="Audio preallocated for each push-to-talk capture session.",
+    )
+    capture_idle_timeout_seconds: float = Field(
+        default=120.0,
+        description="Capture sessions without pushed audio for this long are discarded.",
+    )
+    capture_max_sessions: int = Field(
+        default=16,
+        description="Maximum number of capture sessions that may be open at once.",
+    )
+    capture_analysis_seconds: float = Field(
+        default=0.5,
+        description="Amount of new captured audio that triggers an incremental VAD/ASR pass.",
+    )
+
+    profiling_dir: Path = Field(
+        default=Path("data/profiles"),
+        description="Directory where on-demand profiling captures are written.",
+    )
+    work_queue_url: Optional[str] = Field(
+        default=None,
+        description=(
+            "Shared work queue (sqlite:///path or redis://host:port/db). When set, ASR "
+            "inference is dispatched to workers started with `python -m app.worker`."
+        ),
+    )
+    work_queue_timeout_seconds: float = Field(
+        default=120.0,
+        description=(
+            "How long the dispatcher waits for a worker to return a segment. Segments claimed "
+            "by a worker that stops responding are handed out again after half of this."
+        ),
+    )
 
     class Config:
         env_file = ".env"
@@ -2,17 +2,35 @@ from __future__ import annotations
 
 import json
 import os
+from functools import partial
 from typing import Annotated
 
-from fastapi import FastAPI, File, Form, UploadFile
+import numpy as np
+from fastapi import FastAPI, File, Form, Header, HTTPException, Request, UploadFile
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import FileResponse, Response
 from fastapi.middleware.cors import CORSMiddleware
 from loguru import logger
 
 from app.config import Settings, get_settings
-from app.models.requests import TranscriptionRequest
+from app.models.requests import TranscriptionRequest, TranscriptionSettings
+from app.models.profiling import ProfilingRequest, ProfilingStatus
 from app.models.responses import TranscriptionResult
-from app.models.pipecat import HotkeyEvent, HotkeyRegistration, PipecatOptions
+from app.models.pipecat import (
+    CaptureSessionStatus,
+    HotkeyEvent,
+    HotkeyRegistration,
+    PipecatOptions,
+)
+from app.services.capture_sessions import (
+    CaptureSessionClosedError,
+    CaptureSessionLimitError,
+    CaptureSessionManager,
+)
+from app.services.profiling import ProfilingBusyError, ProfilingController
 from app.services.transcription_service import ParakeetTranscriptionService
+from app.utils.audio_stream import decode_audio_stream, is_streamed_container
+from app.utils.serialization import COLUMNAR_MEDIA_TYPE, MSGPACK_MEDIA_TYPE, render_transcription
 
 
 def create_app(
@@ -42,7 +60,10 @@ def create_app(
         output_devices=[],
         default_hotkey="Ctrl+Shift+Space",
         upload_endpoint=f"{settings.api_prefix}/pipecat/transcriptions",
+        capture_endpoint=f"{settings.api_prefix}/pipecat/sessions/{{request_id}}/audio",
     )
+    capture_sessions = CaptureSessionManager(service, settings=settings)
+    profiler = ProfilingController(service, settings=settings)
 
     hotkey_state: HotkeyEvent | None = None
     hotkey_registered = False
@@ -77,7 +98,31 @@ def create_app(
                     reason="Hotkey not registered yet",
                 )
 
-            return HotkeyRegistration(hotkey=event.hotkey, registered=True)
+            session_id = event.request_id or event.hotkey
+            starting = event.state.lower() == "start" or (
+                event.state.lower() == "toggle" and session_id not in capture_sessions
+            )
+            if starting:
+                request = TranscriptionRequest(
+                    request_id=session_id,
+                    settings=event.settings or TranscriptionSettings(input_source="microphone"),
+                )
+                try:
+                    await run_in_threadpool(capture_sessions.open, session_id, request)
+                except CaptureSessionLimitError as exc:
+                    return HotkeyRegistration(
+                        hotkey=event.hotkey, registered=False, reason=str(exc), request_id=session_id
+                    )
+                return HotkeyRegistration(hotkey=event.hotkey, registered=True, request_id=session_id)
+
+            transcript = await run_in_threadpool(capture_sessions.close, session_id)
+            return HotkeyRegistration(
+                hotkey=event.hotkey,
+                registered=True,
+                reason=None if transcript else "No active capture session",
+                request_id=session_id,
+                transcript=transcript,
+            )
 
         return HotkeyRegistration(
             hotkey=event.hotkey,
@@ -85,27 +130,108 @@ def create_app(
             reason=f"Unknown hotkey state '{event.state}'",
         )
 
-    @app.post(f"{settings.api_prefix}/pipecat/transcriptions", response_model=TranscriptionResult)
+    @app.post(
+        f"{settings.api_prefix}/pipecat/sessions/{{request_id}}/audio",
+        response_model=CaptureSessionStatus,
+    )
+    async def push_capture_audio(request_id: str, request: Request) -> CaptureSessionStatus:
+        """Append little-endian float32 mono PCM at the configured sample rate to a session."""
+
+        session = capture_sessions.get(request_id)
+        if session is None:
+            raise HTTPException(status_code=404, detail=f"No capture session '{request_id}'")
+        body = await request.body()
+        if len(body) % 4:
+            raise HTTPException(status_code=400, detail="Audio body must contain float32 samples")
+        try:
+            await run_in_threadpool(session.push, np.frombuffer(body, dtype="<f4"))
+        except CaptureSessionClosedError as exc:
+            raise HTTPException(status_code=409, detail=str(exc)) from exc
+        return CaptureSessionStatus(
+            request_id=request_id,
+            received_seconds=session.received_seconds,
+            partial_text=session.partial_text,
+        )
+
+    transcription_responses = {
+        200: {
+            "content": {
+                COLUMNAR_MEDIA_TYPE: {},
+                MSGPACK_MEDIA_TYPE: {},
+            },
+            "description": "Transcript in the format selected through the Accept header.",
+        }
+    }
+
+    @app.post(
+        f"{settings.api_prefix}/pipecat/transcriptions",
+        response_model=TranscriptionResult,
+        responses=transcription_responses,
+    )
     async def transcribe_audio(
         file: UploadFile = File(...),
         payload: Annotated[str | None, Form()] = None,
-    ) -> TranscriptionResult:
+        accept: Annotated[str | None, Header()] = None,
+    ) -> Response:
         body = TranscriptionRequest()
         if payload:
             try:
                 body = TranscriptionRequest(**json.loads(payload))
             except json.JSONDecodeError as exc:
                 logger.warning("Failed to decode payload JSON: {}", exc)
-        audio_bytes = await file.read()
-        result = service.transcribe_bytes(audio_bytes, request=body, filename=file.filename)
-        return result
-
-    @app.post(f"{settings.api_prefix}/transcriptions", response_model=TranscriptionResult)
+        if is_streamed_container(file.filename, file.content_type):
+            transcribe = partial(
+                service.transcribe_stream, decode_audio_stream(file.file, settings.sample_rate)
+            )
+            if profiler.active:
+                transcribe = partial(profiler.call, "transcribe_stream", transcribe)
+            result = await run_in_threadpool(transcribe, request=body, filename=file.filename)
+        else:
+            audio_bytes = await file.read()
+            if profiler.active:
+                result = await run_in_threadpool(
+                    profiler.call,
+                    "transcribe_bytes",
+                    service.transcribe_bytes,
+                    audio_bytes,
+                    request=body,
+                    filename=file.filename,
+                )
+            else:
+                result = service.transcribe_bytes(audio_bytes, request=body, filename=file.filename)
+        return render_transcription(result, accept)
+
+    @app.post(
+        f"{settings.api_prefix}/transcriptions",
+        response_model=TranscriptionResult,
+        responses=transcription_responses,
+    )
     async def transcribe_audio_legacy(
         file: UploadFile = File(...),
         payload: Annotated[str | None, Form()] = None,
-    ) -> TranscriptionResult:
-        return await transcribe_audio(file=file, payload=payload)
+        accept: Annotated[str | None, Header()] = None,
+    ) -> Response:
+        return await transcribe_audio(file=file, payload=payload, accept=accept)
+
+    @app.post(f"{settings.api_prefix}/debug/profiling", response_model=ProfilingStatus)
+    async def start_profiling(window: ProfilingRequest) -> ProfilingStatus:
+        """Profile the next N transcription requests and/or a time window."""
+
+        try:
+            return await run_in_threadpool(profiler.start, window.requests, window.seconds)
+        except ProfilingBusyError as exc:
+            raise HTTPException(status_code=409, detail=str(exc)) from exc
+
+    @app.get(f"{settings.api_prefix}/debug/profiling", response_model=ProfilingStatus)
+    async def get_profiling_status() -> ProfilingStatus:
+        return await run_in_threadpool(profiler.status)
+
+    @app.get(f"{settings.api_prefix}/debug/profiling/{{capture_id}}/artifact")
+    async def download_profiling_artifact(capture_id: str) -> FileResponse:
+        path = profiler.artifact_path(capture_id)
+        if path is None:
+            raise HTTPException(status_code=404, detail=f"No profiling artifact '{capture_id}'")
+        return FileResponse(path, media_type="application/zip", filename=path.name)
 
     return app
 
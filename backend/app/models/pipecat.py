@@ -5,6 +5,9 @@ from typing import List, Optional
 
 from pydantic import BaseModel, Field
 
+from app.models.requests import TranscriptionSettings
+from app.models.responses import TranscriptionResult
+
 
 class DeviceInfo(BaseModel):
     """Audio device advertised by the desktop wrapper."""
@@ -31,6 +34,7 @@ class PipecatOptions(BaseModel):
     output_devices: List[DeviceInfo] = Field(default_factory=list)
     default_hotkey: str = Field(default="Ctrl+Shift+Space")
     upload_endpoint: str = Field(default="/api/pipecat/transcriptions")
+    capture_endpoint: str = Field(default="/api/pipecat/sessions/{request_id}/audio")
 
 
 class HotkeyEvent(BaseModel):
@@ -42,6 +46,9 @@ class HotkeyEvent(BaseModel):
     request_id: Optional[str] = Field(
         default=None, description="Optional request identifier for correlation"
     )
+    settings: Optional[TranscriptionSettings] = Field(
+        default=None, description="Settings applied to the capture session opened by this event"
+    )
 
 
 class HotkeyRegistration(BaseModel):
@@ -50,3 +57,17 @@ class HotkeyRegistration(BaseModel):
     hotkey: str
     registered: bool = True
     reason: Optional[str] = None
+    request_id: Optional[str] = Field(
+        default=None, description="Capture session opened or closed by the event"
+    )
+    transcript: Optional[TranscriptionResult] = Field(
+        default=None, description="Final transcript when a capture session was stopped"
+    )
+
+
+class CaptureSessionStatus(BaseModel):
+    """Progress of a push-to-talk capture session."""
+
+    request_id: str
+    received_seconds: float = 0.0
+    partial_text: str = ""
@@ -0,0 +1,30 @@
+from __future__ import annotations
+
+from datetime import datetime
+from typing import Optional
+
+from pydantic import BaseModel, Field
+
+
+class ProfilingRequest(BaseModel):
+    """Window for an on-demand profiling capture."""
+
+    requests: Optional[int] = Field(
+        default=None, ge=1, description="Number of transcription requests to profile."
+    )
+    seconds: Optional[float] = Field(
+        default=None, gt=0, description="Length of the capture window in seconds."
+    )
+
+
+class ProfilingStatus(BaseModel):
+    """State of the current or most recent profiling capture."""
+
+    capture_id: Optional[str] = None
+    state: str = Field(default="idle", description="idle, recording or complete")
+    requests_captured: int = 0
+    requests_remaining: Optional[int] = None
+    expires_at: Optional[datetime] = None
+    artifact_url: Optional[str] = Field(
+        default=None, description="Download location of the combined trace archive."
+    )
@@ -0,0 +1,252 @@
+from __future__ import annotations
+
+import threading
+import time
+from typing import TYPE_CHECKING, Dict, List
+
+import numpy as np
+from loguru import logger
+
+from app.config import Settings, get_settings
+from app.models.requests import TranscriptionRequest
+from app.models.responses import TranscriptSegment, TranscriptionResult
+from app.services.vad import SpeechSegment
+
+if TYPE_CHECKING:
+    from app.services.transcription_service import ParakeetTranscriptionService
+
+
+class CaptureSessionClosedError(RuntimeError):
+    """Raised when audio is pushed to a session that has already been finished."""
+
+
+class CaptureSessionLimitError(RuntimeError):
+    """Raised when opening a session would exceed ``capture_max_sessions``."""
+
+
+class CaptureSession:
+    """Server-side push-to-talk capture that transcribes speech while the hotkey is held.
+
+    Audio is appended into a preallocated float32 buffer. Whenever enough new audio has
+    arrived, VAD scores the strides that arrived since the last analysis and every speech
+    segment already followed by silence is transcribed immediately, so stopping only has
+    to decode the final utterance.
+    """
+
+    def __init__(
+        self,
+        service: ParakeetTranscriptionService,
+        request: TranscriptionRequest,
+        settings: Settings | None = None,
+    ) -> None:
+        self.settings = settings or get_settings()
+        self.service = service
+        self.request = request
+        self.sample_rate = self.settings.sample_rate
+        self._buffer = np.empty(
+            max(1, int(self.settings.capture_buffer_seconds * self.sample_rate)), dtype=np.float32
+        )
+        self._base = 0
+        self._length = 0
+        self._pending = 0
+        self._analyzed = 0
+        # VAD probabilities for the uncommitted window, one per stride from ``_pending``.
+        self._speech_probs: List[float] = []
+        self._offset = 0.0
+        self._segments: List[TranscriptSegment] = []
+        self._finished = False
+        self.last_activity = time.monotonic()
+        self._lock = threading.Lock()
+
+    @property
+    def received_seconds(self) -> float:
+        return (self._base + self._length) / self.sample_rate
+
+    @property
+    def partial_text(self) -> str:
+        return " ".join(segment.text for segment in self._segments if segment.text)
+
+    def push(self, samples: np.ndarray) -> None:
+        """Append mono samples at the configured sample rate and transcribe finished speech."""
+
+        with self._lock:
+            if self._finished:
+                raise CaptureSessionClosedError("Capture session has already been finished")
+            self.last_activity = time.monotonic()
+            self._append(np.asarray(samples, dtype=np.float32).reshape(-1))
+            new_samples = self._length - self._analyzed
+            if new_samples >= self.settings.capture_analysis_seconds * self.sample_rate:
+                self._analyzed = self._length
+                self._commit_finished_speech()
+
+    def finish(self) -> TranscriptionResult:
+        """Transcribe the remaining tail and return the full transcript."""
+
+        with self._lock:
+            if self._finished:
+                raise CaptureSessionClosedError("Capture session has already been finished")
+            self._finished = True
+            window = self._buffer[self._pending : self._length]
+            speech = window
+            if self.request.settings.enable_vad and len(window):
+                segments = self._detect(window)
+                if segments:
+                    speech = self.service.vad.extract(window, segments)
+                elif self._segments:
+                    # Trailing silence after committed speech is not sent to ASR; only a
+                    # capture with no speech at all falls back to the whole waveform.
+                    speech = window[:0]
+            self._commit(speech, self._length)
+            self._buffer = self._buffer[:0]
+            return self.service.build_result(self._segments, self._offset, request=self.request)
+
+    def _append(self, samples: np.ndarray) -> None:
+        required = self._length + len(samples)
+        if required > len(self._buffer):
+            self._compact()
+            required = self._length + len(samples)
+        if required > len(self._buffer):
+            grown = np.empty(max(required, 2 * len(self._buffer)), dtype=np.float32)
+            grown[: self._length] = self._buffer[: self._length]
+            self._buffer = grown
+        self._buffer[self._length : required] = samples
+        self._length = required
+
+    def _compact(self) -> None:
+        """Drop committed audio from the front of the buffer."""
+
+        if self._pending == 0:
+            return
+        remaining = self._length - self._pending
+        self._buffer[:remaining] = self._buffer[self._pending : self._length]
+        self._base += self._pending
+        self._analyzed -= self._pending
+        self._length = remaining
+        self._pending = 0
+
+    def _commit_finished_speech(self) -> None:
+        window = self._buffer[self._pending : self._length]
+        max_pending = int(self.settings.max_segment_seconds * self.sample_rate)
+        if not self.request.settings.enable_vad:
+            if len(window) >= max_pending:
+                self._commit(window, self._length)
+            return
+
+        min_silence = int(self.settings.vad_min_silence_seconds * self.sample_rate)
+        segments = self._detect(window)
+        closed = [segment for segment in segments if segment.end <= len(window) - min_silence]
+        if closed:
+            speech = self.service.vad.extract(window, closed)
+            self._commit(speech, self._pending + closed[-1].end)
+        elif not segments and len(window) > min_silence:
+            # Keep at least ``min_silence`` of lead-in, aligned to the VAD stride so the
+            # probabilities already scored for the remaining window stay valid.
+            stride = self.service.vad.stride
+            self._advance(self._pending + (len(window) - min_silence) // stride * stride)
+        elif len(window) >= max_pending:
+            self._commit(self.service.vad.extract(window, segments), self._length)
+
+    def _detect(self, window: np.ndarray) -> List[SpeechSegment]:
+        """Run VAD over the uncommitted window, scoring only strides not seen before."""
+
+        vad = self.service.vad
+        self._speech_probs.extend(
+            vad.speech_probabilities(window, self.sample_rate, first=len(self._speech_probs))
+        )
+        return vad.segments(
+            self._speech_probs,
+            len(window),
+            self.sample_rate,
+            threshold=self.request.settings.vad_threshold,
+        )
+
+    def _advance(self, until: int) -> None:
+        """Move the start of the uncommitted window, keeping the VAD scores still aligned."""
+
+        shift = until - self._pending
+        stride = self.service.vad.stride
+        if shift % stride == 0:
+            del self._speech_probs[: shift // stride]
+        else:
+            self._speech_probs.clear()
+        self._pending = until
+
+    def _commit(self, speech: np.ndarray, until: int) -> None:
+        if len(speech):
+            self._segments.extend(
+                self.service.transcribe_segments(
+                    speech, self.sample_rate, request=self.request, offset=self._offset
+                )
+            )
+            self._offset += len(speech) / self.sample_rate
+        self._advance(until)
+
+
+class CaptureSessionManager:
+    """Track open capture sessions keyed by the client's request identifier."""
+
+    def __init__(
+        self, service: ParakeetTranscriptionService, settings: Settings | None = None
+    ) -> None:
+        self.settings = settings or get_settings()
+        self.service = service
+        self._sessions: Dict[str, CaptureSession] = {}
+        self._lock = threading.Lock()
+
+    def __contains__(self, session_id: str) -> bool:
+        return self.get(session_id) is not None
+
+    def get(self, session_id: str) -> CaptureSession | None:
+        with self._lock:
+            self._drop_idle()
+            return self._sessions.get(session_id)
+
+    def _drop_idle(self) -> None:
+        """Discard sessions whose client stopped pushing audio without a stop event."""
+
+        cutoff = time.monotonic() - self.settings.capture_idle_timeout_seconds
+        for session_id, session in list(self._sessions.items()):
+            if session.last_activity < cutoff:
+                logger.warning("Dropping idle capture session {}", session_id)
+                del self._sessions[session_id]
+
+    def open(self, session_id: str, request: TranscriptionRequest | None = None) -> CaptureSession:
+        """Open a session, warming the ASR model so the first pushed chunk runs hot.
+
+        Warm-up can take seconds on first use, so it runs outside the manager lock and
+        never holds up pushes or stops for sessions that are already live.
+        """
+
+        with self._lock:
+            session = self._existing_or_check_capacity(session_id)
+        if session is not None:
+            return session
+        self.service.warm_up()
+        with self._lock:
+            session = self._existing_or_check_capacity(session_id)
+            if session is not None:
+                return session
+            request = request or TranscriptionRequest(request_id=session_id)
+            session = CaptureSession(self.service, request, settings=self.settings)
+            self._sessions[session_id] = session
+        logger.info("Opened capture session {}", session_id)
+        return session
+
+    def _existing_or_check_capacity(self, session_id: str) -> CaptureSession | None:
+        self._drop_idle()
+        session = self._sessions.get(session_id)
+        if session is None and len(self._sessions) >= self.settings.capture_max_sessions:
+            raise CaptureSessionLimitError(
+                f"Too many open capture sessions ({self.settings.capture_max_sessions})"
+            )
+        return session
+
+    def close(self, session_id: str) -> TranscriptionResult | None:
+        """Finish and remove a session, returning its transcript if it existed."""
+
+        with self._lock:
+            session = self._sessions.pop(session_id, None)
+        if session is None:
+            return None
+        logger.info("Closing capture session {}", session_id)
+        return session.finish()
@@ -0,0 +1,108 @@
+from __future__ import annotations
+
+import threading
+import time
+import uuid
+from typing import Callable, List, Sequence
+
+import numpy as np
+from loguru import logger
+
+from app.services.work_queue import WorkQueue
+
+_RESULT_OK = b"\x00"
+_RESULT_ERROR = b"\x01"
+
+
+class SegmentDispatcher:
+    """Fan speech segments out to inference workers and gather token ids in order."""
+
+    def __init__(self, work_queue: WorkQueue, timeout: float = 120.0) -> None:
+        self.queue = work_queue
+        self.timeout = timeout
+
+    def map(self, segments: Sequence[np.ndarray]) -> List[np.ndarray]:
+        """Submit every segment before waiting, so all workers can pick them up at once.
+
+        ``timeout`` bounds the whole call, not each segment.
+
+        If any segment fails or times out, the segments not yet collected are cancelled
+        so their tasks and results do not linger in the shared queue.
+        """
+
+        job_ids: List[str] = []
+        token_ids: List[np.ndarray] = []
+        try:
+            for segment in segments:
+                job_id = uuid.uuid4().hex
+                self.queue.submit(job_id, np.ascontiguousarray(segment, dtype=np.float32).tobytes())
+                job_ids.append(job_id)
+
+            deadline = time.monotonic() + self.timeout
+            for job_id in job_ids:
+                result = self.queue.wait_result(job_id, max(deadline - time.monotonic(), 0.0))
+                if result is None:
+                    raise TimeoutError(
+                        f"Workers did not return all {len(job_ids)} segments within {self.timeout}s"
+                    )
+                status, payload = result[:1], result[1:]
+                if status == _RESULT_ERROR:
+                    raise RuntimeError(f"Worker failed on segment {job_id}: {payload.decode()}")
+                token_ids.append(np.frombuffer(payload, dtype=np.int32))
+        except BaseException:
+            logger.warning("Cancelling {} outstanding segments", len(job_ids) - len(token_ids))
+            try:
+                self.queue.cancel(job_ids[len(token_ids) :])
+            except Exception:
+                logger.exception("Could not cancel outstanding segments")
+            raise
+        return token_ids
+
+
+class InferenceWorker:
+    """Stateless worker that pulls waveform segments and returns greedy token ids."""
+
+    def __init__(
+        self,
+        work_queue: WorkQueue,
+        infer: Callable[[np.ndarray], Sequence[int]],
+        poll_timeout: float = 1.0,
+        retry_delay: float = 0.5,
+        max_retry_delay: float = 30.0,
+    ) -> None:
+        self.queue = work_queue
+        self.infer = infer
+        self.poll_timeout = poll_timeout
+        self.retry_delay = retry_delay
+        self.max_retry_delay = max_retry_delay
+
+    def process_one(self) -> bool:
+        """Handle a single task, returning ``False`` when none arrived in time."""
+
+        task = self.queue.claim(self.poll_timeout)
+        if task is None:
+            return False
+        job_id, payload = task
+        try:
+            token_ids = self.infer(np.frombuffer(payload, dtype=np.float32))
+            result = _RESULT_OK + np.asarray(token_ids, dtype=np.int32).tobytes()
+        except Exception as exc:
+            logger.exception("Inference failed for segment {}", job_id)
+            result = _RESULT_ERROR + str(exc).encode()
+        self.queue.complete(job_id, result)
+        return True
+
+    def run(self, stop: threading.Event | None = None) -> None:
+        """Process tasks until ``stop`` is set, backing off while the queue is unreachable."""
+
+        stop = stop or threading.Event()
+        delay = self.retry_delay
+        while not stop.is_set():
+            try:
+                self.process_one()
+            except Exception:
+                logger.exception("Work queue error, retrying in {:.1f}s", delay)
+                stop.wait(delay)
+                delay = min(delay * 2, self.max_retry_delay)
+            else:
+                delay = self.retry_delay
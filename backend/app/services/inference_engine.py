@@ -0,0 +1,185 @@
+from __future__ import annotations
+
+import threading
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from typing import Dict, Iterator, Mapping, Optional, Sequence
+
+import numpy as np
+import onnxruntime as ort
+from loguru import logger
+
+_ORT_DTYPES = {
+    "tensor(int64)": np.int64,
+    "tensor(int32)": np.int32,
+    "tensor(bool)": np.bool_,
+    "tensor(float)": np.float32,
+}
+
+# Engines whose ``infer`` calls are redirected in the current context, keyed by ``id``.
+_REDIRECTS: ContextVar[Mapping[int, "BucketedInferenceEngine"]] = ContextVar(
+    "inference_engine_redirects", default={}
+)
+
+
+@dataclass
+class _Bucket:
+    """Preallocated input/output buffers and the IOBinding for one padded length."""
+
+    length: int
+    audio: np.ndarray
+    binding: ort.IOBinding
+    lengths: Optional[np.ndarray] = None
+    mask: Optional[np.ndarray] = None
+    logits: Optional[np.ndarray] = None
+    token_ids: Optional[np.ndarray] = None
+    dirty: int = field(default=0)
+
+
+class BucketedInferenceEngine:
+    """Run the ASR session on zero-padded, fixed-length buckets through ``IOBinding``.
+
+    Segment lengths are rounded up to the next configured bucket so ONNX Runtime sees a
+    small set of input shapes and can reuse its memory patterns. Each bucket owns numpy
+    buffers for the audio, logits and token ids that are bound once and reused, so the
+    steady state performs no per-call allocations beyond what ORT needs internally.
+
+    Padding is only applied when the model takes a length or mask input that tells it
+    which samples are real; otherwise segments run at their exact length, since padding
+    would change the logits of models that attend over the whole sequence.
+    """
+
+    def __init__(
+        self,
+        session: ort.InferenceSession,
+        sample_rate: int,
+        bucket_seconds: Sequence[float],
+    ) -> None:
+        inputs = session.get_inputs()
+        if not inputs:
+            raise RuntimeError("Parakeet ONNX session has no inputs")
+        self.session = session
+        self.input_name = inputs[0].name
+        self.length_input: Optional[ort.NodeArg] = None
+        self.mask_input: Optional[ort.NodeArg] = None
+        for extra in inputs[1:]:
+            dtype = _ORT_DTYPES.get(extra.type)
+            if len(extra.shape) == 1 and dtype in (np.int64, np.int32):
+                self.length_input = extra
+            elif len(extra.shape) == 2 and dtype is not None:
+                self.mask_input = extra
+            else:
+                raise RuntimeError(
+                    f"Unsupported ASR model input '{extra.name}' ({extra.type}, shape {extra.shape})"
+                )
+        self.output_name = session.get_outputs()[0].name
+        self.padded = self.length_input is not None or self.mask_input is not None
+        self.bucket_lengths = (
+            sorted({int(seconds * sample_rate) for seconds in bucket_seconds}) if self.padded else []
+        )
+        self._buckets: Dict[int, _Bucket] = {}
+        self._lock = threading.Lock()
+
+    def warm_up(self) -> None:
+        """Allocate every bucket and run it once on silence."""
+
+        for length in self.bucket_lengths:
+            self.infer(np.zeros(length, dtype=np.float32))
+
+    @contextmanager
+    def redirected(self, replacement: BucketedInferenceEngine) -> Iterator[None]:
+        """Send ``infer`` calls made from the current context to ``replacement``.
+
+        Other threads and requests keep using this engine, which lets a profiler run a
+        single request against its own instrumented session.
+        """
+
+        token = _REDIRECTS.set({**_REDIRECTS.get(), id(self): replacement})
+        try:
+            yield
+        finally:
+            _REDIRECTS.reset(token)
+
+    def infer(self, waveform: np.ndarray) -> np.ndarray:
+        """Return greedy token ids for ``waveform``."""
+
+        replacement = _REDIRECTS.get().get(id(self))
+        if replacement is not None:
+            return replacement.infer(waveform)
+        if not self.padded:
+            audio = np.asarray(waveform, dtype=np.float32)[np.newaxis, :]
+            (logits,) = self.session.run([self.output_name], {self.input_name: audio})
+            return np.argmax(logits[0], axis=-1)
+
+        samples = len(waveform)
+        with self._lock:
+            bucket = self._bucket_for(samples)
+            bucket.audio[0, :samples] = waveform
+            if bucket.dirty > samples:
+                bucket.audio[0, samples : bucket.dirty] = 0.0
+            bucket.dirty = samples
+            if bucket.lengths is not None:
+                bucket.lengths[0] = samples
+            if bucket.mask is not None:
+                bucket.mask[0, :samples] = 1
+                bucket.mask[0, samples:] = 0
+
+            self.session.run_with_iobinding(bucket.binding)
+            if bucket.logits is None:
+                self._bind_outputs(bucket)
+
+            frames = bucket.logits.shape[1]
+            valid = min(frames, -(-samples * frames // bucket.length))
+            np.argmax(bucket.logits[0], axis=-1, out=bucket.token_ids)
+            # Copy while holding the lock: the bucket buffer is shared by all callers.
+            return bucket.token_ids[:valid].copy()
+
+    def _bucket_for(self, samples: int) -> _Bucket:
+        length = next((size for size in self.bucket_lengths if size >= samples), samples)
+        bucket = self._buckets.get(length)
+        if bucket is not None:
+            return bucket
+
+        audio = np.zeros((1, length), dtype=np.float32)
+        binding = self.session.io_binding()
+        binding.bind_input(
+            self.input_name, "cpu", 0, np.float32, list(audio.shape), audio.ctypes.data
+        )
+        lengths = None
+        if self.length_input is not None:
+            dtype = _ORT_DTYPES[self.length_input.type]
+            lengths = np.array([length], dtype=dtype)
+            binding.bind_input(
+                self.length_input.name, "cpu", 0, dtype, list(lengths.shape), lengths.ctypes.data
+            )
+        mask = None
+        if self.mask_input is not None:
+            dtype = _ORT_DTYPES[self.mask_input.type]
+            mask = np.zeros((1, length), dtype=dtype)
+            binding.bind_input(
+                self.mask_input.name, "cpu", 0, dtype, list(mask.shape), mask.ctypes.data
+            )
+        binding.bind_output(self.output_name, "cpu")
+        bucket = _Bucket(length=length, audio=audio, binding=binding, lengths=lengths, mask=mask)
+        if length in self.bucket_lengths:
+            self._buckets[length] = bucket
+        else:
+            logger.debug("Segment of {} samples exceeds the largest inference bucket", samples)
+        return bucket
+
+    def _bind_outputs(self, bucket: _Bucket) -> None:
+        """Adopt the shape ORT produced on the first run and bind a reusable output buffer."""
+
+        logits = bucket.binding.copy_outputs_to_cpu()[0]
+        bucket.logits = np.ascontiguousarray(logits)
+        bucket.token_ids = np.empty(bucket.logits.shape[1], dtype=np.int64)
+        bucket.binding.clear_binding_outputs()
+        bucket.binding.bind_output(
+            self.output_name,
+            "cpu",
+            0,
+            bucket.logits.dtype.type,
+            list(bucket.logits.shape),
+            bucket.logits.ctypes.data,
+        )
@@ -0,0 +1,289 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from dataclasses import dataclass
+from glob import escape as glob_escape
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+import requests
+from loguru import logger
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover - not available on Windows
+    fcntl = None
+
+_COPY_CHUNK_BYTES = 1 << 20
+
+_PROCESS_LOCKS: Dict[str, threading.Lock] = {}
+_PROCESS_LOCKS_GUARD = threading.Lock()
+
+
+class ModelFetchError(RuntimeError):
+    """Raised when a model resource cannot be downloaded or fails verification."""
+
+
+@dataclass(frozen=True)
+class RemoteResource:
+    """A file that has to be present locally before the pipeline can run."""
+
+    name: str
+    url: str
+    path: Path
+    sha256: Optional[str] = None
+
+
+def load_manifest(path: Path | None) -> Dict[str, str]:
+    """Load a JSON manifest mapping resource names to SHA-256 hex digests."""
+
+    if path is None:
+        return {}
+    with Path(path).open("r", encoding="utf-8") as handle:
+        manifest = json.load(handle)
+    return {str(name): str(digest).lower() for name, digest in manifest.items()}
+
+
+def sha256_file(path: Path) -> str:
+    """Return the SHA-256 hex digest of a file."""
+
+    digest = hashlib.sha256()
+    with path.open("rb") as handle:
+        for chunk in iter(lambda: handle.read(_COPY_CHUNK_BYTES), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+@contextmanager
+def _exclusive_lock(path: Path) -> Iterator[None]:
+    """Hold an exclusive lock on ``path`` against other threads and, via ``flock``, processes."""
+
+    with _PROCESS_LOCKS_GUARD:
+        process_lock = _PROCESS_LOCKS.setdefault(str(path), threading.Lock())
+    with process_lock:
+        if fcntl is None:
+            yield
+            return
+        with path.open("a+b") as handle:
+            fcntl.flock(handle.fileno(), fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(handle.fileno(), fcntl.LOCK_UN)
+
+
+class ModelFetcher:
+    """Download model resources with parallel ranged requests, resume and verification.
+
+    Each byte range is streamed into its own ``.part`` file next to the target so an
+    interrupted download picks up where it stopped. Parts are only resumed while the
+    server still reports the ETag (or Last-Modified date) they were started from, which
+    is recorded in a ``.parts.json`` file and sent as ``If-Range``. Completed parts are
+    stitched into a temporary file, checked against the expected digest and atomically
+    renamed into place, so the final path only ever holds a complete, verified file.
+
+    The API server and every inference worker may provision the same model directory
+    at once, so each fetch holds an exclusive ``.lock`` file next to the target.
+    """
+
+    def __init__(
+        self,
+        *,
+        connections: int = 4,
+        min_range_bytes: int = 8 << 20,
+        timeout: float = 60.0,
+    ) -> None:
+        self.connections = max(1, connections)
+        self.min_range_bytes = max(1, min_range_bytes)
+        self.timeout = timeout
+
+    def fetch_all(self, resources: Iterable[RemoteResource]) -> List[Path]:
+        """Fetch several resources concurrently and return their local paths."""
+
+        resources = list(resources)
+        if not resources:
+            return []
+        with ThreadPoolExecutor(max_workers=len(resources)) as pool:
+            return list(pool.map(self.fetch, resources))
+
+    def fetch(self, resource: RemoteResource) -> Path:
+        """Ensure a single resource is present locally and matches its checksum."""
+
+        path = resource.path
+        if self._is_installed(resource):
+            return path
+
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with _exclusive_lock(path.with_name(f"{path.name}.lock")):
+            # Another process may have installed the file while we waited for the lock.
+            if self._is_installed(resource):
+                return path
+            logger.info("Downloading {} from {}", resource.name, resource.url)
+            size, ranged, validator = self._probe(resource.url)
+            self._discard_stale_parts(resource, size, validator)
+            if ranged and size is not None and size > 0:
+                parts = self._download_ranges(resource, self._split(size), validator)
+            else:
+                part = path.with_name(f"{path.name}.part")
+                self._download_part(resource.url, part, 0, None, None)
+                parts = [part]
+            self._install(resource, parts, size)
+        logger.info("Installed {} to {}", resource.name, path)
+        return path
+
+    def _is_installed(self, resource: RemoteResource) -> bool:
+        path = resource.path
+        if not path.exists():
+            return False
+        if resource.sha256 is None or sha256_file(path) == resource.sha256.lower():
+            return True
+        logger.warning("Checksum mismatch for {}, downloading again", path)
+        return False
+
+    def _state_path(self, path: Path) -> Path:
+        return path.with_name(f"{path.name}.parts.json")
+
+    def _part_paths(self, path: Path) -> List[Path]:
+        return [
+            *path.parent.glob(f"{glob_escape(path.name)}.part"),
+            *path.parent.glob(f"{glob_escape(path.name)}.*-*.part"),
+        ]
+
+    def _discard_stale_parts(
+        self, resource: RemoteResource, size: Optional[int], validator: Optional[str]
+    ) -> None:
+        """Drop parts left over from a different version of the remote file."""
+
+        path = resource.path
+        state_path = self._state_path(path)
+        state = {"url": resource.url, "size": size, "validator": validator}
+        try:
+            previous = json.loads(state_path.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            previous = None
+        if validator is None or previous != state:
+            for part in self._part_paths(path):
+                logger.info("Discarding stale partial download {}", part)
+                part.unlink(missing_ok=True)
+        if validator is None:
+            state_path.unlink(missing_ok=True)
+        else:
+            state_path.write_text(json.dumps(state), encoding="utf-8")
+
+    def _probe(self, url: str) -> Tuple[Optional[int], bool, Optional[str]]:
+        try:
+            response = requests.head(
+                url,
+                allow_redirects=True,
+                timeout=self.timeout,
+                headers={"Accept-Encoding": "identity"},
+            )
+        except requests.RequestException as exc:
+            logger.warning("Could not probe {}: {}", url, exc)
+            return None, False, None
+        if response.status_code >= 400:
+            return None, False, None
+        length = response.headers.get("Content-Length")
+        size = int(length) if length and length.isdigit() else None
+        ranged = response.headers.get("Accept-Ranges", "").lower() == "bytes"
+        # If-Range only accepts strong ETags; fall back to the modification date.
+        etag = response.headers.get("ETag")
+        validator = etag if etag and not etag.startswith("W/") else response.headers.get("Last-Modified")
+        return size, ranged, validator
+
+    def _split(self, size: int) -> List[Tuple[int, int]]:
+        count = min(self.connections, max(1, size // self.min_range_bytes))
+        step = -(-size // count)
+        return [(start, min(start + step, size) - 1) for start in range(0, size, step)]
+
+    def _download_ranges(
+        self, resource: RemoteResource, ranges: List[Tuple[int, int]], validator: Optional[str]
+    ) -> List[Path]:
+        path = resource.path
+        parts = [path.with_name(f"{path.name}.{start}-{end}.part") for start, end in ranges]
+        with ThreadPoolExecutor(max_workers=len(ranges)) as pool:
+            futures = [
+                pool.submit(self._download_part, resource.url, part, start, end, validator)
+                for part, (start, end) in zip(parts, ranges)
+            ]
+            for future in futures:
+                future.result()
+        return parts
+
+    def _download_part(
+        self, url: str, part: Path, start: int, end: Optional[int], validator: Optional[str]
+    ) -> None:
+        """Stream ``[start, end]`` (inclusive) into ``part``, resuming from its current size.
+
+        With a ``validator`` the range is requested with ``If-Range``, so a file that
+        changed upstream is answered in full instead of being stitched onto old bytes.
+        """
+
+        existing = part.stat().st_size if part.exists() else 0
+        headers = {"Accept-Encoding": "identity"}
+        if end is not None:
+            expected = end - start + 1
+            if existing == expected:
+                return
+            if existing > expected:
+                existing = 0
+            headers["Range"] = f"bytes={start + existing}-{end}"
+            if validator is not None:
+                headers["If-Range"] = validator
+        else:
+            existing = 0
+
+        with requests.get(url, headers=headers, stream=True, timeout=self.timeout) as response:
+            response.raise_for_status()
+            if "Range" in headers and response.status_code != 206:
+                part.unlink(missing_ok=True)
+                if "If-Range" in headers:
+                    raise ModelFetchError(f"{url} changed on the server during the download")
+                raise ModelFetchError(f"Server ignored range request for {url}")
+            with part.open("ab" if existing else "wb") as destination:
+                for chunk in response.iter_content(_COPY_CHUNK_BYTES):
+                    destination.write(chunk)
+
+    def _install(self, resource: RemoteResource, parts: List[Path], size: Optional[int]) -> None:
+        path = resource.path
+        handle, name = tempfile.mkstemp(dir=path.parent, prefix=f".{path.name}.", suffix=".tmp")
+        temporary = Path(name)
+        digest = hashlib.sha256()
+        written = 0
+        with os.fdopen(handle, "wb") as destination:
+            for part in parts:
+                with part.open("rb") as source:
+                    for chunk in iter(lambda: source.read(_COPY_CHUNK_BYTES), b""):
+                        digest.update(chunk)
+                        destination.write(chunk)
+                        written += len(chunk)
+            destination.flush()
+            os.fsync(destination.fileno())
+
+        try:
+            if size is not None and written != size:
+                raise ModelFetchError(
+                    f"Downloaded {written} bytes for {resource.name}, expected {size}"
+                )
+            if resource.sha256 is not None and digest.hexdigest() != resource.sha256.lower():
+                raise ModelFetchError(
+                    f"Checksum mismatch for {resource.name}: "
+                    f"expected {resource.sha256}, got {digest.hexdigest()}"
+                )
+        except ModelFetchError:
+            temporary.unlink(missing_ok=True)
+            for part in parts:
+                part.unlink(missing_ok=True)
+            self._state_path(path).unlink(missing_ok=True)
+            raise
+
+        os.replace(temporary, path)
+        for part in parts:
+            part.unlink(missing_ok=True)
+        self._state_path(path).unlink(missing_ok=True)
@@ -1,14 +1,12 @@
 from __future__ import annotations
 
 import json
-import shutil
-from pathlib import Path
-from typing import Any, Dict
+from typing import Any, Dict, List
 import onnxruntime as ort
-import requests
 from loguru import logger
 
 from app.config import Settings, get_settings
+from app.services.model_fetcher import ModelFetcher, RemoteResource, load_manifest
 
 PARAKEET_MODEL_URL = (
     "https://huggingface.co/onnx-community/parakeet-ctc-v3/resolve/main/model.onnx?download=1"
@@ -26,28 +24,48 @@ class ModelRegistry:
         self.settings = settings or get_settings()
         self._sessions: Dict[str, ort.InferenceSession] = {}
         self._tokenizer: Dict[str, Any] | None = None
+        self._fetcher = ModelFetcher(connections=self.settings.model_download_connections)
+        self._resources_ready = False
 
     def ensure_resources(self) -> None:
         """Ensure that all required model files are available locally."""
 
-        self._download_if_missing(
-            self.settings.models.parakeet_model_path, PARAKEET_MODEL_URL
-        )
-        self._download_if_missing(
-            self.settings.models.parakeet_tokenizer_path, PARAKEET_TOKENIZER_URL
-        )
-        self._download_if_missing(self.settings.models.silero_vad_path, SILERO_VAD_URL)
+        if self._resources_ready:
+            return
+        self._fetcher.fetch_all(self.resources())
+        self._resources_ready = True
+
+    def resources(self) -> List[RemoteResource]:
+        """Describe the remote files required by the pipeline."""
+
+        models = self.settings.models
+        manifest = load_manifest(models.checksum_manifest)
+        return [
+            RemoteResource(
+                name="parakeet_model",
+                url=PARAKEET_MODEL_URL,
+                path=models.parakeet_model_path,
+                sha256=manifest.get("parakeet_model"),
+            ),
+            RemoteResource(
+                name="parakeet_tokenizer",
+                url=PARAKEET_TOKENIZER_URL,
+                path=models.parakeet_tokenizer_path,
+                sha256=manifest.get("parakeet_tokenizer"),
+            ),
+            RemoteResource(
+                name="silero_vad",
+                url=SILERO_VAD_URL,
+                path=models.silero_vad_path,
+                sha256=manifest.get("silero_vad"),
+            ),
+        ]
 
     def get_asr_session(self) -> ort.InferenceSession:
         """Return the cached ASR ONNX session."""
 
         if "parakeet" not in self._sessions:
-            self.ensure_resources()
-            providers = ["CUDAExecutionProvider", "CPUExecutionProvider"]
-            self._sessions["parakeet"] = ort.InferenceSession(
-                str(self.settings.models.parakeet_model_path),
-                providers=providers,
-            )
+            self._sessions["parakeet"] = self.open_asr_session()
             logger.info("Loaded Parakeet v3 ASR model from {}", self.settings.models.parakeet_model_path)
         return self._sessions["parakeet"]
 
@@ -55,15 +73,34 @@ class ModelRegistry:
         """Return the cached Silero VAD session."""
 
         if "silero_vad" not in self._sessions:
-            self.ensure_resources()
-            providers = ["CPUExecutionProvider"]
-            self._sessions["silero_vad"] = ort.InferenceSession(
-                str(self.settings.models.silero_vad_path),
-                providers=providers,
-            )
+            self._sessions["silero_vad"] = self.open_vad_session()
             logger.info("Loaded Silero VAD model from {}", self.settings.models.silero_vad_path)
         return self._sessions["silero_vad"]
 
+    def open_asr_session(
+        self, session_options: ort.SessionOptions | None = None
+    ) -> ort.InferenceSession:
+        """Create a new, uncached ASR session (e.g. with profiling enabled)."""
+
+        self.ensure_resources()
+        return ort.InferenceSession(
+            str(self.settings.models.parakeet_model_path),
+            sess_options=session_options,
+            providers=["CUDAExecutionProvider", "CPUExecutionProvider"],
+        )
+
+    def open_vad_session(
+        self, session_options: ort.SessionOptions | None = None
+    ) -> ort.InferenceSession:
+        """Create a new, uncached Silero VAD session."""
+
+        self.ensure_resources()
+        return ort.InferenceSession(
+            str(self.settings.models.silero_vad_path),
+            sess_options=session_options,
+            providers=["CPUExecutionProvider"],
+        )
+
     def get_tokenizer(self) -> Dict[str, Any]:
         """Return the tokenizer metadata for the ASR model."""
 
@@ -73,18 +110,6 @@ class ModelRegistry:
                 self._tokenizer = json.load(handle)
         return self._tokenizer
 
-    def _download_if_missing(self, path: Path, url: str) -> None:
-        if path.exists():
-            return
-
-        logger.info("Downloading %s", url)
-        path.parent.mkdir(parents=True, exist_ok=True)
-        response = requests.get(url, timeout=60, stream=True)
-        response.raise_for_status()
-        with path.open("wb") as destination:
-            shutil.copyfileobj(response.raw, destination)
-        logger.info("Downloaded resource to %s", path)
-
 
 _registry: ModelRegistry | None = None
 
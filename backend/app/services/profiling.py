@@ -0,0 +1,327 @@
+from __future__ import annotations
+
+import bisect
+import cProfile
+import io
+import json
+import pstats
+import threading
+import time
+import uuid
+import zipfile
+from contextlib import ExitStack
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Tuple, TypeVar
+
+import onnxruntime as ort
+from loguru import logger
+
+from app.config import Settings, get_settings
+from app.models.profiling import ProfilingStatus
+from app.services.inference_engine import BucketedInferenceEngine
+from app.services.model_registry import get_registry
+
+T = TypeVar("T")
+
+SessionFactory = Callable[[ort.SessionOptions], ort.InferenceSession]
+
+# Request stages reported from the Python profile, matched on (file name, function name).
+STAGES: Dict[str, Tuple[Tuple[str, str], ...]] = {
+    "decode_audio": (("audio_utils.py", "load_audio"), ("audio_stream.py", "decode_audio_stream")),
+    "vad": (("vad.py", "speech_probabilities"), ("vad.py", "segments"), ("vad.py", "extract")),
+    "asr_inference": (("inference_engine.py", "infer"), ("dispatcher.py", "map")),
+    "ctc_decode": (("transcription_service.py", "decode"),),
+    "assemble": (("transcription_service.py", "build_result"),),
+}
+
+
+class ProfilingBusyError(RuntimeError):
+    """Raised when a capture is requested while another one is still recording."""
+
+
+class _CountingSession:
+    """Proxy for a profiling session that counts runs so ORT events can be split per request."""
+
+    def __init__(self, session: ort.InferenceSession) -> None:
+        self.session = session
+        self.runs = 0
+
+    def run(self, *args: Any, **kwargs: Any) -> Any:
+        self.runs += 1
+        return self.session.run(*args, **kwargs)
+
+    def run_with_iobinding(self, *args: Any, **kwargs: Any) -> Any:
+        self.runs += 1
+        return self.session.run_with_iobinding(*args, **kwargs)
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self.session, name)
+
+
+@dataclass
+class _Capture:
+    capture_id: str
+    directory: Path
+    remaining: Optional[int]
+    deadline: Optional[float]
+    expires_at: Optional[datetime]
+    sessions: Dict[str, _CountingSession] = field(default_factory=dict)
+    asr_engine: Optional[BucketedInferenceEngine] = None
+    requests: List[Dict[str, Any]] = field(default_factory=list)
+
+
+def _stage_seconds(stats: pstats.Stats) -> Dict[str, float]:
+    totals = {stage: 0.0 for stage in STAGES}
+    for (filename, _, function), (_, _, _, cumulative, _) in stats.stats.items():  # type: ignore[attr-defined]
+        for stage, targets in STAGES.items():
+            if any(filename.endswith(name) and function == target for name, target in targets):
+                totals[stage] += cumulative
+    return totals
+
+
+def _operator_milliseconds(trace_path: Path, runs_per_request: List[int]) -> List[Dict[str, float]]:
+    """Sum ORT kernel time per operator type for each request, in milliseconds."""
+
+    with trace_path.open("r", encoding="utf-8") as handle:
+        events = json.load(handle)
+
+    runs = sorted(
+        (event for event in events if event.get("cat") == "Session" and event.get("name") == "model_run"),
+        key=lambda event: event["ts"],
+    )
+    owners: List[Optional[int]] = []
+    for index, count in enumerate(runs_per_request):
+        owners.extend([index] * count)
+    starts = [run["ts"] for run in runs]
+
+    totals: List[Dict[str, float]] = [{} for _ in runs_per_request]
+    for event in events:
+        if event.get("cat") != "Node" or not event.get("name", "").endswith("_kernel_time"):
+            continue
+        position = bisect.bisect_right(starts, event["ts"]) - 1
+        if position < 0 or position >= len(owners):
+            continue
+        run = runs[position]
+        if event["ts"] > run["ts"] + run["dur"]:
+            continue
+        op_name = event.get("args", {}).get("op_name", event["name"])
+        request_totals = totals[owners[position]]
+        request_totals[op_name] = request_totals.get(op_name, 0.0) + event["dur"] / 1000.0
+    return totals
+
+
+class ProfilingController:
+    """Capture ORT session profiles and Python profiles for a window of live requests.
+
+    While nothing is armed, ``active`` is ``False`` and callers bypass the controller
+    entirely. Arming it opens fresh ONNX Runtime sessions with ``enable_profiling``.
+    Each profiled request is redirected to them for its own context only, so concurrent
+    capture sessions and other requests keep using the regular sessions and never show
+    up in the trace. Profiled requests are serialized for the duration of the capture.
+    """
+
+    def __init__(
+        self,
+        service: Any,
+        settings: Settings | None = None,
+        session_factories: Dict[str, SessionFactory] | None = None,
+    ) -> None:
+        self.settings = settings or get_settings()
+        self.service = service
+        self.session_factories = session_factories
+        self.active = False
+        self._capture: Optional[_Capture] = None
+        self._last: Optional[ProfilingStatus] = None
+        # ``_lock`` guards capture state; ``_run_lock`` serializes profiled requests.
+        self._lock = threading.Lock()
+        self._run_lock = threading.Lock()
+        self._profiling = False
+
+    def start(self, requests: int | None = None, seconds: float | None = None) -> ProfilingStatus:
+        """Arm a capture for the next ``requests`` requests and/or ``seconds`` seconds."""
+
+        with self._lock:
+            if self._capture is not None:
+                raise ProfilingBusyError(
+                    f"Profiling capture {self._capture.capture_id} is already running"
+                )
+            if requests is None and seconds is None:
+                requests = 1
+            capture_id = datetime.utcnow().strftime("%Y%m%dT%H%M%S") + "-" + uuid.uuid4().hex[:8]
+            directory = Path(self.settings.profiling_dir) / capture_id
+            directory.mkdir(parents=True, exist_ok=True)
+            capture = _Capture(
+                capture_id=capture_id,
+                directory=directory,
+                remaining=requests,
+                deadline=time.monotonic() + seconds if seconds else None,
+                expires_at=datetime.utcnow() + timedelta(seconds=seconds) if seconds else None,
+            )
+            self._open_sessions(capture)
+            self._capture = capture
+            self.active = True
+            logger.info("Started profiling capture {}", capture_id)
+            return self._status(capture)
+
+    def status(self) -> ProfilingStatus:
+        with self._lock:
+            capture = self._capture
+            # A running profiled request still uses the sessions; it finishes the capture.
+            if capture is not None and not self._profiling and self._expired(capture):
+                self._finish()
+            if self._capture is not None:
+                return self._status(self._capture)
+            return self._last or ProfilingStatus()
+
+    def artifact_path(self, capture_id: str) -> Optional[Path]:
+        path = Path(self.settings.profiling_dir) / f"{capture_id}.zip"
+        if path.parent.resolve() != Path(self.settings.profiling_dir).resolve() or not path.exists():
+            return None
+        return path
+
+    def call(self, label: str, func: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+        """Run ``func`` under the profiler if a capture is armed.
+
+        Profiled calls are serialized by their own lock, so ``status`` and ``start`` never
+        wait for a request to finish.
+        """
+
+        with self._run_lock:
+            with self._lock:
+                capture = self._capture
+                if capture is not None and self._expired(capture):
+                    self._finish()
+                    capture = None
+                self._profiling = capture is not None
+            if capture is not None:
+                return self._profile(capture, label, func, *args, **kwargs)
+        return func(*args, **kwargs)
+
+    def _profile(
+        self, capture: _Capture, label: str, func: Callable[..., T], *args: Any, **kwargs: Any
+    ) -> T:
+        runs_before = {name: session.runs for name, session in capture.sessions.items()}
+        profiler = cProfile.Profile()
+        started = time.perf_counter()
+        try:
+            with self._redirect(capture):
+                profiler.enable()
+                try:
+                    return func(*args, **kwargs)
+                finally:
+                    profiler.disable()
+        finally:
+            wall_seconds = time.perf_counter() - started
+            self._record(capture, label, profiler, wall_seconds, runs_before)
+            with self._lock:
+                self._profiling = False
+                if capture.remaining is not None:
+                    capture.remaining -= 1
+                if (capture.remaining is not None and capture.remaining <= 0) or self._expired(capture):
+                    self._finish()
+
+    def _open_sessions(self, capture: _Capture) -> None:
+        factories = self.session_factories
+        if factories is None:
+            registry = get_registry(self.settings)
+            factories = {"asr": registry.open_asr_session, "vad": registry.open_vad_session}
+
+        engine = getattr(self.service, "engine", None)
+        vad = getattr(self.service, "vad", None)
+        wanted = {
+            "asr": isinstance(engine, BucketedInferenceEngine),
+            "vad": getattr(vad, "session", None) is not None,
+        }
+        for name, factory in factories.items():
+            if not wanted.get(name):
+                continue
+            options = ort.SessionOptions()
+            options.enable_profiling = True
+            options.profile_file_prefix = str(capture.directory / f"ort_{name}")
+            capture.sessions[name] = _CountingSession(factory(options))
+
+        if "asr" in capture.sessions:
+            capture.asr_engine = BucketedInferenceEngine(
+                capture.sessions["asr"],  # type: ignore[arg-type]
+                sample_rate=self.settings.sample_rate,
+                bucket_seconds=self.settings.inference_bucket_seconds,
+            )
+
+    def _redirect(self, capture: _Capture) -> ExitStack:
+        stack = ExitStack()
+        engine = getattr(self.service, "engine", None)
+        if capture.asr_engine is not None and engine is not None:
+            stack.enter_context(engine.redirected(capture.asr_engine))
+        if "vad" in capture.sessions:
+            stack.enter_context(self.service.vad.redirected(capture.sessions["vad"]))
+        return stack
+
+    def _record(
+        self,
+        capture: _Capture,
+        label: str,
+        profiler: cProfile.Profile,
+        wall_seconds: float,
+        runs_before: Dict[str, int],
+    ) -> None:
+        index = len(capture.requests) + 1
+        profiler.dump_stats(str(capture.directory / f"request-{index:03d}.prof"))
+        text = io.StringIO()
+        stats = pstats.Stats(profiler, stream=text)
+        stats.sort_stats("cumulative").print_stats(40)
+        (capture.directory / f"request-{index:03d}.txt").write_text(text.getvalue(), encoding="utf-8")
+        capture.requests.append(
+            {
+                "index": index,
+                "label": label,
+                "wall_seconds": wall_seconds,
+                "python_stage_seconds": _stage_seconds(stats),
+                "ort_runs": {
+                    name: session.runs - runs_before[name]
+                    for name, session in capture.sessions.items()
+                },
+            }
+        )
+
+    def _expired(self, capture: _Capture) -> bool:
+        return capture.deadline is not None and time.monotonic() >= capture.deadline
+
+    def _finish(self) -> None:
+        capture = self._capture
+        if capture is None:
+            return
+        self._capture = None
+        self.active = False
+
+        for name, session in capture.sessions.items():
+            trace = Path(session.end_profiling())
+            runs = [request["ort_runs"].get(name, 0) for request in capture.requests]
+            for request, operators in zip(capture.requests, _operator_milliseconds(trace, runs)):
+                request.setdefault("ort_operator_ms", {})[name] = operators
+
+        summary = {"capture_id": capture.capture_id, "requests": capture.requests}
+        (capture.directory / "summary.json").write_text(json.dumps(summary, indent=2), encoding="utf-8")
+
+        archive = capture.directory.with_suffix(".zip")
+        with zipfile.ZipFile(archive, "w", compression=zipfile.ZIP_DEFLATED) as bundle:
+            for path in sorted(capture.directory.iterdir()):
+                bundle.write(path, arcname=f"{capture.capture_id}/{path.name}")
+
+        self._last = self._status(capture, state="complete")
+        logger.info("Finished profiling capture {} with {} requests", capture.capture_id, len(capture.requests))
+
+    def _status(self, capture: _Capture, state: str = "recording") -> ProfilingStatus:
+        return ProfilingStatus(
+            capture_id=capture.capture_id,
+            state=state,
+            requests_captured=len(capture.requests),
+            requests_remaining=capture.remaining,
+            expires_at=capture.expires_at,
+            artifact_url=(
+                f"{self.settings.api_prefix}/debug/profiling/{capture.capture_id}/artifact"
+                if state == "complete"
+                else None
+            ),
+        )
@@ -1,18 +1,24 @@
 from __future__ import annotations
 
+import threading
 import uuid
 from dataclasses import dataclass
 from pathlib import Path
-from typing import List, Sequence
+from typing import Iterable, List, Sequence
 
 import numpy as np
+import soundfile as sf
 from loguru import logger
 
 from app.config import Settings, get_settings
 from app.models.requests import TranscriptionRequest
 from app.models.responses import TranscriptSegment, TranscriptionResult
+from app.services.capture_sessions import CaptureSession
+from app.services.dispatcher import SegmentDispatcher
+from app.services.inference_engine import BucketedInferenceEngine
 from app.services.model_registry import get_registry
 from app.services.vad import SileroVAD
+from app.services.work_queue import open_shared_work_queue
 from app.utils.audio_utils import load_audio, save_waveform, split_segments
 
 
@@ -33,15 +39,12 @@ class DecoderVocabulary:
         return cls(tokens=tokens, blank_id=blank_id)
 
     def decode(self, token_ids: Sequence[int]) -> str:
-        pieces: List[str] = []
-        previous = None
-        for token_id in token_ids:
-            if token_id == self.blank_id or token_id == previous:
-                previous = token_id
-                continue
-            pieces.append(self.tokens[token_id])
-            previous = token_id
-        text = "".join(pieces)
+        ids = np.asarray(token_ids)
+        if ids.size == 0:
+            return ""
+        keep = ids != self.blank_id
+        keep[1:] &= ids[1:] != ids[:-1]
+        text = "".join(self.tokens[token_id] for token_id in ids[keep].tolist())
         return " ".join(text.split())
 
 
@@ -52,7 +55,23 @@ class ParakeetTranscriptionService:
         self.vad = SileroVAD(self.settings)
         tokenizer = self.registry.get_tokenizer()
         self.vocab = DecoderVocabulary.from_tokenizer_dict(tokenizer)
-        self.session = self.registry.get_asr_session()
+        self.session = None
+        self.dispatcher: SegmentDispatcher | None = None
+        self.engine: BucketedInferenceEngine | None = None
+        if self.settings.work_queue_url:
+            timeout = self.settings.work_queue_timeout_seconds
+            self.dispatcher = SegmentDispatcher(
+                open_shared_work_queue(self.settings.work_queue_url, timeout), timeout=timeout
+            )
+        else:
+            self.session = self.registry.get_asr_session()
+            self.engine = BucketedInferenceEngine(
+                self.session,
+                sample_rate=self.settings.sample_rate,
+                bucket_seconds=self.settings.inference_bucket_seconds,
+            )
+        self._warmed_up = False
+        self._warm_up_lock = threading.Lock()
 
     def transcribe_bytes(
         self,
@@ -71,17 +90,77 @@ class ParakeetTranscriptionService:
                 logger.debug("Detected %d speech segments via VAD", len(vad_segments))
                 waveform = self.vad.extract(waveform, vad_segments)
 
-        text_segments: List[TranscriptSegment] = []
-        transcript_parts: List[str] = []
         processed_duration = len(waveform) / sample_rate
-        offset = 0.0
-
-        for segment_waveform in split_segments(
-            waveform, sample_rate, self.settings.max_segment_seconds
-        ):
-            tokens = self._infer(segment_waveform)
-            text = self.vocab.decode(tokens)
-            transcript_parts.append(text)
+        text_segments = self.transcribe_segments(waveform, sample_rate, request=request)
+        result = self.build_result(text_segments, processed_duration, request=request)
+
+        if filename:
+            target = Path(self.settings.storage_dir) / result.request_id
+            save_waveform(target.with_suffix(".wav"), waveform, sample_rate)
+
+        return result
+
+    def transcribe_stream(
+        self,
+        chunks: Iterable[np.ndarray],
+        request: TranscriptionRequest | None = None,
+        filename: str | None = None,
+    ) -> TranscriptionResult:
+        """Transcribe decoded audio chunks at the target sample rate as they arrive.
+
+        Chunks flow through the incremental VAD/ASR of a capture session, so finished
+        speech is transcribed and released while later audio is still being decoded.
+        """
+
+        request = request or TranscriptionRequest()
+        if request.request_id is None:
+            request = request.copy(update={"request_id": str(uuid.uuid4())})
+        session = CaptureSession(self, request, settings=self.settings)
+
+        if not filename:
+            for chunk in chunks:
+                session.push(chunk)
+            return session.finish()
+
+        target = (Path(self.settings.storage_dir) / request.request_id).with_suffix(".wav")
+        target.parent.mkdir(parents=True, exist_ok=True)
+        with sf.SoundFile(
+            target, mode="w", samplerate=self.settings.sample_rate, channels=1
+        ) as destination:
+            for chunk in chunks:
+                destination.write(chunk)
+                session.push(chunk)
+        return session.finish()
+
+    def warm_up(self) -> None:
+        """Allocate every inference bucket so the first real request avoids lazy ORT setup."""
+
+        if self._warmed_up or self.engine is None:
+            return
+        with self._warm_up_lock:
+            if not self._warmed_up:
+                self.engine.warm_up()
+                self._warmed_up = True
+
+    def transcribe_segments(
+        self,
+        waveform: np.ndarray,
+        sample_rate: int,
+        request: TranscriptionRequest | None = None,
+        offset: float = 0.0,
+    ) -> List[TranscriptSegment]:
+        """Run ASR over a speech waveform, returning segments placed after ``offset``."""
+
+        request = request or TranscriptionRequest()
+        text_segments: List[TranscriptSegment] = []
+
+        pieces = list(split_segments(waveform, sample_rate, self.settings.max_segment_seconds))
+        if self.dispatcher is not None:
+            decoded = [self.vocab.decode(tokens) for tokens in self.dispatcher.map(pieces)]
+        else:
+            decoded = [self.vocab.decode(self._infer(piece)) for piece in pieces]
+
+        for segment_waveform, text in zip(pieces, decoded):
             end_time = offset + len(segment_waveform) / sample_rate
             text_segments.append(
                 TranscriptSegment(
@@ -94,38 +173,34 @@ class ParakeetTranscriptionService:
             )
             offset = end_time
 
-        transcript_text = " ".join(part for part in transcript_parts if part)
+        return text_segments
+
+    def build_result(
+        self,
+        text_segments: List[TranscriptSegment],
+        duration: float,
+        request: TranscriptionRequest | None = None,
+    ) -> TranscriptionResult:
+        """Assemble transcript segments into the final response payload."""
+
+        request = request or TranscriptionRequest()
+        transcript_text = " ".join(segment.text for segment in text_segments if segment.text)
 
         if request.settings.enable_punctuation:
             transcript_text = self._restore_punctuation(transcript_text)
             for segment in text_segments:
                 segment.text = self._restore_punctuation(segment.text)
 
-        request_id = request.request_id or str(uuid.uuid4())
-        settings_applied = request.settings.dict(exclude_none=True)
-
-        if filename:
-            target = Path(self.settings.storage_dir) / request_id
-            save_waveform(target.with_suffix(".wav"), waveform, sample_rate)
-
         return TranscriptionResult(
-            request_id=request_id,
+            request_id=request.request_id or str(uuid.uuid4()),
             text=transcript_text,
-            duration=processed_duration,
+            duration=duration,
             segments=text_segments,
-            settings_applied=settings_applied,
+            settings_applied=request.settings.dict(exclude_none=True),
         )
 
     def _infer(self, waveform: np.ndarray) -> Sequence[int]:
-        inputs = self.session.get_inputs()
-        if not inputs:
-            raise RuntimeError("Parakeet ONNX session has no inputs")
-        input_name = inputs[0].name
-        audio = waveform.astype(np.float32)[np.newaxis, :]
-        outputs = self.session.run(None, {input_name: audio})
-        logits = outputs[0]
-        token_ids = np.argmax(logits, axis=-1).flatten().tolist()
-        return token_ids
+        return self.engine.infer(waveform)
 
     def _restore_punctuation(self, text: str) -> str:
         normalized = text.strip()
@@ -1,7 +1,9 @@
 from __future__ import annotations
 
+from contextlib import contextmanager
+from contextvars import ContextVar
 from dataclasses import dataclass
-from typing import Iterable, List
+from typing import Iterable, Iterator, List, Mapping, Sequence
 
 import numpy as np
 import onnxruntime as ort
@@ -10,6 +12,12 @@ from app.config import Settings, get_settings
 from app.services.model_registry import get_registry
 
 
+# VAD sessions substituted in the current context, keyed by ``id`` of the SileroVAD.
+_REDIRECTS: ContextVar[Mapping[int, ort.InferenceSession]] = ContextVar(
+    "vad_session_redirects", default={}
+)
+
+
 @dataclass
 class SpeechSegment:
     start: int
@@ -19,25 +27,55 @@ class SpeechSegment:
 class SileroVAD:
     """Wrapper around the Silero Voice Activity Detection ONNX model."""
 
+    stride = 512
+    window = 1536
+
     def __init__(self, settings: Settings | None = None) -> None:
         self.settings = settings or get_settings()
         self.registry = get_registry(self.settings)
         self.session: ort.InferenceSession = self.registry.get_vad_session()
 
+    @contextmanager
+    def redirected(self, session: ort.InferenceSession) -> Iterator[None]:
+        """Score windows with ``session`` for calls made from the current context only."""
+
+        token = _REDIRECTS.set({**_REDIRECTS.get(), id(self): session})
+        try:
+            yield
+        finally:
+            _REDIRECTS.reset(token)
+
     def detect(self, waveform: np.ndarray, sample_rate: int, threshold: float | None = None) -> List[SpeechSegment]:
-        threshold = threshold or self.settings.vad_threshold
-        stride = 512
-        window = 1536
+        probs = self.speech_probabilities(waveform, sample_rate)
+        return self.segments(probs, len(waveform), sample_rate, threshold)
+
+    def speech_probabilities(self, waveform: np.ndarray, sample_rate: int, first: int = 0) -> List[float]:
+        """Score the analysis windows of ``waveform`` starting with window index ``first``.
+
+        Windows are independent, so callers holding a growing buffer can keep earlier
+        probabilities and only score the strides that arrived since.
+        """
+
+        session = _REDIRECTS.get().get(id(self), self.session)
         probs: List[float] = []
-        for start in range(0, len(waveform) - window, stride):
-            chunk = waveform[start : start + window]
+        for start in range(first * self.stride, len(waveform) - self.window, self.stride):
+            chunk = waveform[start : start + self.window]
             ort_inputs = {
                 "input": chunk.reshape(1, -1),
                 "sr": np.array(sample_rate, dtype=np.int64),
             }
-            (prob,) = self.session.run(None, ort_inputs)
+            (prob,) = session.run(None, ort_inputs)
             probs.append(float(prob.squeeze()))
+        return probs
 
+    def segments(
+        self, probs: Sequence[float], length: int, sample_rate: int, threshold: float | None = None
+    ) -> List[SpeechSegment]:
+        """Turn per-window probabilities for ``length`` samples into merged speech segments."""
+
+        threshold = threshold or self.settings.vad_threshold
+        stride = self.stride
+        window = self.window
         speech_segments: List[SpeechSegment] = []
         active = False
         seg_start = 0
@@ -53,7 +91,7 @@ class SileroVAD:
                     speech_segments.append(SpeechSegment(seg_start, time_end))
 
         if active:
-            speech_segments.append(SpeechSegment(seg_start, len(waveform)))
+            speech_segments.append(SpeechSegment(seg_start, length))
 
         merged: List[SpeechSegment] = []
         for segment in speech_segments:
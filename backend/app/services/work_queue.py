@@ -0,0 +1,433 @@
+from __future__ import annotations
+
+import queue
+import socket
+import sqlite3
+import threading
+import time
+from abc import ABC, abstractmethod
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence, Set, Tuple
+from urllib.parse import urlparse
+
+from loguru import logger
+
+Task = Tuple[str, bytes]
+
+
+class WorkQueue(ABC):
+    """Shared queue connecting the dispatcher with stateless inference workers.
+
+    The dispatcher ``submit``s tasks and later ``wait_result``s for each of them;
+    workers ``claim`` tasks and ``complete`` them with a result payload.
+    """
+
+    @abstractmethod
+    def submit(self, job_id: str, payload: bytes) -> None:
+        """Enqueue a task for any worker."""
+
+    @abstractmethod
+    def claim(self, timeout: float) -> Optional[Task]:
+        """Take the next task, waiting up to ``timeout`` seconds."""
+
+    @abstractmethod
+    def complete(self, job_id: str, result: bytes) -> None:
+        """Publish the result for a claimed task."""
+
+    @abstractmethod
+    def wait_result(self, job_id: str, timeout: float) -> Optional[bytes]:
+        """Wait up to ``timeout`` seconds for a task result and remove it from the queue."""
+
+    @abstractmethod
+    def cancel(self, job_ids: Sequence[str]) -> None:
+        """Drop pending tasks and results of jobs whose dispatcher has given up on them."""
+
+
+class InProcessWorkQueue(WorkQueue):
+    """Queue shared by threads of a single process."""
+
+    def __init__(self) -> None:
+        self._tasks: "queue.Queue[Task]" = queue.Queue()
+        self._results: Dict[str, bytes] = {}
+        self._cancelled: Set[str] = set()
+        self._done = threading.Condition()
+
+    def submit(self, job_id: str, payload: bytes) -> None:
+        self._tasks.put((job_id, payload))
+
+    def claim(self, timeout: float) -> Optional[Task]:
+        deadline = time.monotonic() + timeout
+        while True:
+            try:
+                job_id, payload = self._tasks.get(timeout=max(deadline - time.monotonic(), 0))
+            except queue.Empty:
+                return None
+            with self._done:
+                if job_id not in self._cancelled:
+                    return job_id, payload
+                self._cancelled.discard(job_id)
+
+    def complete(self, job_id: str, result: bytes) -> None:
+        with self._done:
+            if job_id in self._cancelled:
+                self._cancelled.discard(job_id)
+                return
+            self._results[job_id] = result
+            self._done.notify_all()
+
+    def wait_result(self, job_id: str, timeout: float) -> Optional[bytes]:
+        with self._done:
+            self._done.wait_for(lambda: job_id in self._results, timeout=timeout)
+            return self._results.pop(job_id, None)
+
+    def cancel(self, job_ids: Sequence[str]) -> None:
+        with self._done:
+            for job_id in job_ids:
+                if self._results.pop(job_id, None) is None:
+                    self._cancelled.add(job_id)
+
+
+class SQLiteWorkQueue(WorkQueue):
+    """Queue stored in a SQLite database shared by processes on one host.
+
+    Claimed tasks whose result has not arrived within ``visibility_timeout`` seconds
+    are handed out again, so a crashed worker does not stall a request. Results nobody
+    collected within ``result_ttl`` seconds are purged when later results arrive.
+    """
+
+    def __init__(
+        self,
+        path: Path,
+        *,
+        poll_interval: float = 0.01,
+        visibility_timeout: float = 60.0,
+        result_ttl: float = 600.0,
+    ) -> None:
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.poll_interval = poll_interval
+        self.visibility_timeout = visibility_timeout
+        self.result_ttl = result_ttl
+        self._local = threading.local()
+        with self._connect() as connection:
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute(
+                "CREATE TABLE IF NOT EXISTS tasks ("
+                " job_id TEXT PRIMARY KEY, payload BLOB NOT NULL, claimed_at REAL)"
+            )
+            connection.execute(
+                "CREATE TABLE IF NOT EXISTS results ("
+                " job_id TEXT PRIMARY KEY, payload BLOB NOT NULL, completed_at REAL NOT NULL)"
+            )
+
+    def _connect(self) -> sqlite3.Connection:
+        connection = getattr(self._local, "connection", None)
+        if connection is None:
+            connection = sqlite3.connect(self.path, timeout=30.0, isolation_level=None)
+            self._local.connection = connection
+        return connection
+
+    def submit(self, job_id: str, payload: bytes) -> None:
+        self._connect().execute(
+            "INSERT INTO tasks (job_id, payload) VALUES (?, ?)", (job_id, payload)
+        )
+
+    def claim(self, timeout: float) -> Optional[Task]:
+        deadline = time.monotonic() + timeout
+        connection = self._connect()
+        while True:
+            now = time.time()
+            row = connection.execute(
+                "UPDATE tasks SET claimed_at = ? WHERE job_id = ("
+                " SELECT job_id FROM tasks WHERE claimed_at IS NULL OR claimed_at < ?"
+                " ORDER BY rowid LIMIT 1) RETURNING job_id, payload",
+                (now, now - self.visibility_timeout),
+            ).fetchone()
+            if row is not None:
+                return row[0], row[1]
+            if time.monotonic() >= deadline:
+                return None
+            time.sleep(self.poll_interval)
+
+    def complete(self, job_id: str, result: bytes) -> None:
+        connection = self._connect()
+        now = time.time()
+        connection.execute("BEGIN IMMEDIATE")
+        try:
+            # A missing task was cancelled or already completed by a worker that
+            # re-claimed it, so there is nobody left to read this result.
+            claimed = connection.execute("DELETE FROM tasks WHERE job_id = ?", (job_id,)).rowcount
+            if claimed:
+                connection.execute(
+                    "INSERT OR REPLACE INTO results (job_id, payload, completed_at) VALUES (?, ?, ?)",
+                    (job_id, result, now),
+                )
+            connection.execute(
+                "DELETE FROM results WHERE completed_at < ?", (now - self.result_ttl,)
+            )
+        except BaseException:
+            connection.execute("ROLLBACK")
+            raise
+        connection.execute("COMMIT")
+
+    def wait_result(self, job_id: str, timeout: float) -> Optional[bytes]:
+        deadline = time.monotonic() + timeout
+        connection = self._connect()
+        while True:
+            row = connection.execute(
+                "DELETE FROM results WHERE job_id = ? RETURNING payload", (job_id,)
+            ).fetchone()
+            if row is not None:
+                return row[0]
+            if time.monotonic() >= deadline:
+                return None
+            time.sleep(self.poll_interval)
+
+    def cancel(self, job_ids: Sequence[str]) -> None:
+        if not job_ids:
+            return
+        connection = self._connect()
+        placeholders = ", ".join("?" for _ in job_ids)
+        connection.execute("BEGIN IMMEDIATE")
+        try:
+            connection.execute(f"DELETE FROM tasks WHERE job_id IN ({placeholders})", tuple(job_ids))
+            connection.execute(f"DELETE FROM results WHERE job_id IN ({placeholders})", tuple(job_ids))
+        except BaseException:
+            connection.execute("ROLLBACK")
+            raise
+        connection.execute("COMMIT")
+
+
+class _RespConnection:
+    """Minimal client for the Redis serialization protocol (RESP2).
+
+    Every command must be answered within ``timeout`` seconds, plus however long a
+    blocking command was asked to ``block``.
+    """
+
+    def __init__(
+        self, host: str, port: int, db: int, password: Optional[str], timeout: float = 10.0
+    ) -> None:
+        self.timeout = timeout
+        self._socket = socket.create_connection((host, port), timeout=timeout)
+        self._reader = self._socket.makefile("rb")
+        if password:
+            self.execute("AUTH", password)
+        if db:
+            self.execute("SELECT", str(db))
+
+    def execute(self, *args: str | bytes, block: float = 0.0):
+        parts: List[bytes] = [f"*{len(args)}\r\n".encode()]
+        for arg in args:
+            data = arg if isinstance(arg, bytes) else str(arg).encode()
+            parts.append(b"$%d\r\n%s\r\n" % (len(data), data))
+        self._socket.settimeout(self.timeout + block)
+        self._socket.sendall(b"".join(parts))
+        return self._read()
+
+    def close(self) -> None:
+        self._reader.close()
+        self._socket.close()
+
+    def _read(self):
+        line = self._reader.readline()
+        if not line:
+            raise ConnectionError("Redis connection closed")
+        prefix, body = line[:1], line[1:-2]
+        if prefix == b"+":
+            return body.decode()
+        if prefix == b"-":
+            raise RuntimeError(f"Redis error: {body.decode()}")
+        if prefix == b":":
+            return int(body)
+        if prefix == b"$":
+            length = int(body)
+            if length < 0:
+                return None
+            data = self._reader.read(length + 2)
+            return data[:-2]
+        if prefix == b"*":
+            length = int(body)
+            if length < 0:
+                return None
+            return [self._read() for _ in range(length)]
+        raise RuntimeError(f"Unexpected Redis reply {line!r}")
+
+
+class RedisWorkQueue(WorkQueue):
+    """Queue backed by Redis lists, usable by workers on any machine.
+
+    Task ids move atomically from the pending list into a processing list when claimed,
+    and the claiming worker then takes a lease key for ``visibility_timeout`` seconds.
+    Ids in the processing list whose lease has lapsed belong to a worker that died, and
+    a later ``claim`` puts them back on the pending list. Because the lease is set one
+    round trip after the move, an id is only re-queued once it has been seen without a
+    lease for at least ``lease_grace`` seconds. Payloads live in their own keys, so
+    cancelling a job only has to delete them.
+
+    Each thread keeps its own connection. A connection that fails or times out is
+    dropped and the error raised, so the next call on that thread reconnects.
+    """
+
+    def __init__(
+        self,
+        host: str = "localhost",
+        port: int = 6379,
+        db: int = 0,
+        password: Optional[str] = None,
+        *,
+        namespace: str = "parakeet",
+        result_ttl: int = 600,
+        visibility_timeout: float = 60.0,
+        lease_grace: float = 5.0,
+    ) -> None:
+        self._address = (host, port, db, password)
+        self.tasks_key = f"{namespace}:tasks"
+        self.processing_key = f"{namespace}:processing"
+        self.namespace = namespace
+        self.result_ttl = result_ttl
+        self.visibility_timeout = visibility_timeout
+        self.lease_grace = lease_grace
+        self._local = threading.local()
+        self._leaseless: Dict[str, float] = {}
+        self._leaseless_lock = threading.Lock()
+
+    def _connection(self) -> _RespConnection:
+        connection = getattr(self._local, "connection", None)
+        if connection is None:
+            connection = _RespConnection(*self._address)
+            self._local.connection = connection
+        return connection
+
+    def _execute(self, *args: str | bytes, block: float = 0.0):
+        connection = self._connection()
+        try:
+            return connection.execute(*args, block=block)
+        except (OSError, ConnectionError):
+            # The reply stream is out of sync or gone; never reuse this socket.
+            self._local.connection = None
+            connection.close()
+            raise
+
+    def _task_key(self, job_id: str) -> str:
+        return f"{self.namespace}:task:{job_id}"
+
+    def _lease_key(self, job_id: str) -> str:
+        return f"{self.namespace}:lease:{job_id}"
+
+    def _result_key(self, job_id: str) -> str:
+        return f"{self.namespace}:result:{job_id}"
+
+    def submit(self, job_id: str, payload: bytes) -> None:
+        self._execute("SET", self._task_key(job_id), payload, "EX", str(self.result_ttl))
+        self._execute("LPUSH", self.tasks_key, job_id)
+
+    def claim(self, timeout: float) -> Optional[Task]:
+        self._requeue_stale()
+        deadline = time.monotonic() + timeout
+        while True:
+            wait = max(deadline - time.monotonic(), 0.01)
+            reply = self._execute(
+                "BRPOPLPUSH", self.tasks_key, self.processing_key, str(wait), block=wait
+            )
+            if reply is None:
+                return None
+            job_id = reply.decode()
+            self._execute(
+                "SET", self._lease_key(job_id), "1", "PX", str(int(self.visibility_timeout * 1000))
+            )
+            payload = self._execute("GET", self._task_key(job_id))
+            if payload is not None:
+                return job_id, payload
+            # Cancelled or expired before any worker reached it.
+            self._release(job_id)
+            if time.monotonic() >= deadline:
+                return None
+
+    def _requeue_stale(self) -> None:
+        with self._leaseless_lock:
+            now = time.monotonic()
+            processing = set()
+            for raw_id in self._execute("LRANGE", self.processing_key, "0", "-1") or []:
+                job_id = raw_id.decode()
+                processing.add(job_id)
+                if self._execute("EXISTS", self._lease_key(job_id)):
+                    self._leaseless.pop(job_id, None)
+                    continue
+                # The claimer may not have set its lease yet; wait for a later scan.
+                if now - self._leaseless.setdefault(job_id, now) < self.lease_grace:
+                    continue
+                del self._leaseless[job_id]
+                # Only the client whose LREM removed the id puts it back, so it is queued once.
+                if self._execute("LREM", self.processing_key, "1", job_id):
+                    logger.warning("Re-queueing segment {} from a stalled worker", job_id)
+                    self._execute("RPUSH", self.tasks_key, job_id)
+            for job_id in set(self._leaseless) - processing:
+                del self._leaseless[job_id]
+
+    def _release(self, job_id: str) -> None:
+        self._execute("LREM", self.processing_key, "1", job_id)
+        self._execute("DEL", self._lease_key(job_id))
+
+    def complete(self, job_id: str, result: bytes) -> None:
+        # A missing payload means the job was cancelled or already completed by a
+        # worker that re-claimed it, so there is nobody left to read this result.
+        if self._execute("DEL", self._task_key(job_id)):
+            self._execute("RPUSH", self._result_key(job_id), result)
+            self._execute("EXPIRE", self._result_key(job_id), str(self.result_ttl))
+        self._release(job_id)
+
+    def wait_result(self, job_id: str, timeout: float) -> Optional[bytes]:
+        wait = max(timeout, 0.01)
+        reply = self._execute("BLPOP", self._result_key(job_id), str(wait), block=wait)
+        return None if reply is None else reply[1]
+
+    def cancel(self, job_ids: Sequence[str]) -> None:
+        if not job_ids:
+            return
+        keys = [self._task_key(job_id) for job_id in job_ids]
+        keys.extend(self._result_key(job_id) for job_id in job_ids)
+        self._execute("DEL", *keys)
+
+
+_IN_PROCESS_QUEUES: Dict[str, InProcessWorkQueue] = {}
+_IN_PROCESS_QUEUES_LOCK = threading.Lock()
+
+
+def open_work_queue(url: str, timeout: float = 120.0) -> WorkQueue:
+    """Create a work queue from a ``sqlite:///path``, ``redis://host:port/db`` or ``memory://name`` URL.
+
+    As with SQLAlchemy, ``sqlite:///data/queue.db`` is relative and
+    ``sqlite:////var/lib/queue.db`` is absolute. ``memory://name`` returns the same
+    in-process queue for every caller using that name; it is meant for tests that run
+    workers as threads next to the dispatcher. ``timeout`` is how long dispatchers
+    wait for a result; claimed tasks are handed out again after half of it, so the
+    segment of a crashed worker can still be retried before the request gives up.
+    """
+
+    parsed = urlparse(url)
+    if parsed.scheme == "sqlite" and url.startswith("sqlite:///"):
+        return SQLiteWorkQueue(Path(url[len("sqlite:///") :]), visibility_timeout=timeout / 2)
+    if parsed.scheme == "redis":
+        return RedisWorkQueue(
+            parsed.hostname or "localhost",
+            parsed.port or 6379,
+            int(parsed.path.lstrip("/") or 0),
+            parsed.password,
+            visibility_timeout=timeout / 2,
+        )
+    if parsed.scheme == "memory":
+        with _IN_PROCESS_QUEUES_LOCK:
+            return _IN_PROCESS_QUEUES.setdefault(parsed.netloc, InProcessWorkQueue())
+    raise ValueError(f"Unsupported work queue URL '{url}'")
+
+
+def open_shared_work_queue(url: str, timeout: float = 120.0) -> WorkQueue:
+    """Open a queue that the API server and ``python -m app.worker`` processes can share."""
+
+    work_queue = open_work_queue(url, timeout)
+    if isinstance(work_queue, InProcessWorkQueue):
+        raise ValueError(
+            f"Work queue '{url}' only exists inside one process; use sqlite:/// or redis://"
+        )
+    return work_queue
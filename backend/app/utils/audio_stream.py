@@ -0,0 +1,48 @@
+from __future__ import annotations
+
+from pathlib import PurePath
+from typing import BinaryIO, Iterator, Optional
+
+import av
+import numpy as np
+
+STREAMED_CONTENT_TYPES = {
+    "audio/webm",
+    "video/webm",
+    "audio/ogg",
+    "audio/opus",
+    "audio/mpeg",
+    "audio/mp3",
+    "audio/mp4",
+    "audio/aac",
+}
+STREAMED_EXTENSIONS = {".webm", ".weba", ".ogg", ".oga", ".opus", ".mp3", ".m4a", ".aac"}
+
+
+def is_streamed_container(filename: Optional[str], content_type: Optional[str]) -> bool:
+    """Return whether an upload should be demuxed incrementally instead of read whole."""
+
+    if content_type and content_type.split(";")[0].strip().lower() in STREAMED_CONTENT_TYPES:
+        return True
+    return bool(filename) and PurePath(filename).suffix.lower() in STREAMED_EXTENSIONS
+
+
+def decode_audio_stream(source: BinaryIO, target_sample_rate: int) -> Iterator[np.ndarray]:
+    """Demux and decode a compressed container into mono float32 chunks.
+
+    Packets are read from ``source`` as they are needed and each decoded frame is
+    resampled to ``target_sample_rate`` straight away, so only one codec frame is
+    decoded in memory at a time.
+    """
+
+    with av.open(source, mode="r") as container:
+        if not container.streams.audio:
+            raise ValueError("Container has no audio stream")
+        stream = container.streams.audio[0]
+        resampler = av.AudioResampler(format="flt", layout="mono", rate=target_sample_rate)
+        for packet in container.demux(stream):
+            for frame in packet.decode():
+                for resampled in resampler.resample(frame):
+                    yield resampled.to_ndarray().reshape(-1)
+        for resampled in resampler.resample(None):
+            yield resampled.to_ndarray().reshape(-1)
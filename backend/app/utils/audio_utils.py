@@ -7,12 +7,24 @@ from typing import Iterable, Tuple
 import numpy as np
 import soundfile as sf
 
+from app.utils.audio_stream import decode_audio_stream
 
-def load_audio(data: bytes, target_sample_rate: int) -> Tuple[np.ndarray, int]:
-    """Load audio from a bytes object and resample to the target sample rate."""
 
-    with io.BytesIO(data) as buffer:
-        waveform, sample_rate = sf.read(buffer)
+def load_audio(data: bytes, target_sample_rate: int) -> Tuple[np.ndarray, int]:
+    """Load audio from a bytes object and resample to the target sample rate.
+
+    Containers libsndfile cannot read (e.g. WebM) are decoded through libav instead.
+    """
+
+    try:
+        with io.BytesIO(data) as buffer:
+            waveform, sample_rate = sf.read(buffer)
+    except RuntimeError:
+        with io.BytesIO(data) as buffer:
+            chunks = list(decode_audio_stream(buffer, target_sample_rate))
+        if not chunks:
+            return np.zeros(0, dtype=np.float32), target_sample_rate
+        return np.concatenate(chunks), target_sample_rate
 
     if waveform.ndim == 2:
         waveform = waveform.mean(axis=1)
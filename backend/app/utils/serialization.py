@@ -0,0 +1,138 @@
+from __future__ import annotations
+
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import orjson
+from fastapi.responses import Response
+from pydantic import BaseModel
+
+from app.models.responses import TranscriptionResult
+
+JSON_MEDIA_TYPE = "application/json"
+COLUMNAR_MEDIA_TYPE = "application/vnd.parakeet.columnar+json"
+MSGPACK_MEDIA_TYPE = "application/msgpack"
+
+_MEDIA_TYPE_ALIASES = {
+    "application/x-msgpack": MSGPACK_MEDIA_TYPE,
+    "application/vnd.msgpack": MSGPACK_MEDIA_TYPE,
+}
+
+
+def _encode_default(obj: Any) -> Any:
+    """Fallback hook used by the encoders for values they cannot handle natively.
+
+    Pydantic models are passed through as their field ``__dict__`` so that nested
+    models are walked by the encoder itself without an intermediate ``.dict()`` copy.
+    """
+
+    if isinstance(obj, BaseModel):
+        return obj.__dict__
+    if isinstance(obj, datetime):
+        return obj.isoformat()
+    raise TypeError(f"Object of type {type(obj).__name__} is not serializable")
+
+
+def _columnar_payload(result: TranscriptionResult) -> Dict[str, Any]:
+    """Flatten transcript segments into parallel arrays."""
+
+    segments = result.segments
+    return {
+        "request_id": result.request_id,
+        "created_at": result.created_at,
+        "text": result.text,
+        "duration": result.duration,
+        "segments": {
+            "start": [segment.start for segment in segments],
+            "end": [segment.end for segment in segments],
+            "text": [segment.text for segment in segments],
+            "speaker": [segment.speaker for segment in segments],
+            "confidence": [segment.confidence for segment in segments],
+        },
+        "settings_applied": result.settings_applied,
+    }
+
+
+def encode_json(result: TranscriptionResult) -> bytes:
+    """Encode a transcription result using the default JSON shape."""
+
+    return orjson.dumps(result, default=_encode_default)
+
+
+def encode_columnar(result: TranscriptionResult) -> bytes:
+    """Encode a transcription result with segments stored as columns."""
+
+    return orjson.dumps(_columnar_payload(result), default=_encode_default)
+
+
+def encode_msgpack(result: TranscriptionResult) -> bytes:
+    """Encode a transcription result as MessagePack in the columnar layout."""
+
+    import msgpack
+
+    return msgpack.packb(_columnar_payload(result), default=_encode_default, use_bin_type=True)
+
+
+def _msgpack_available() -> bool:
+    try:
+        import msgpack  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+_ENCODERS: Dict[str, Callable[[TranscriptionResult], bytes]] = {
+    JSON_MEDIA_TYPE: encode_json,
+    COLUMNAR_MEDIA_TYPE: encode_columnar,
+    MSGPACK_MEDIA_TYPE: encode_msgpack,
+}
+
+
+def _parse_accept(accept: str) -> List[Tuple[str, float]]:
+    """Parse an ``Accept`` header into ``(media_type, quality)`` pairs ordered by preference."""
+
+    entries: List[Tuple[str, float, int]] = []
+    for position, part in enumerate(accept.split(",")):
+        media_type, *params = [piece.strip() for piece in part.split(";")]
+        if not media_type:
+            continue
+        quality = 1.0
+        for param in params:
+            key, _, value = param.partition("=")
+            if key.strip().lower() == "q":
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        entries.append((media_type.lower(), quality, position))
+    entries.sort(key=lambda entry: (-entry[1], entry[2]))
+    return [(media_type, quality) for media_type, quality, _ in entries]
+
+
+def negotiate_media_type(accept: Optional[str]) -> str:
+    """Select the response media type for an ``Accept`` header, defaulting to JSON."""
+
+    if not accept:
+        return JSON_MEDIA_TYPE
+    for media_type, quality in _parse_accept(accept):
+        if quality <= 0:
+            continue
+        media_type = _MEDIA_TYPE_ALIASES.get(media_type, media_type)
+        if media_type == MSGPACK_MEDIA_TYPE and not _msgpack_available():
+            continue
+        if media_type in _ENCODERS:
+            return media_type
+        if media_type in {"*/*", "application/*"}:
+            return JSON_MEDIA_TYPE
+    return JSON_MEDIA_TYPE
+
+
+def render_transcription(result: TranscriptionResult, accept: Optional[str] = None) -> Response:
+    """Serialize a transcription result without re-validating it through the response model."""
+
+    media_type = negotiate_media_type(accept)
+    return Response(
+        content=_ENCODERS[media_type](result),
+        media_type=media_type,
+        headers={"Vary": "Accept"},
+    )
@@ -0,0 +1,40 @@
+from __future__ import annotations
+
+import signal
+import threading
+
+from loguru import logger
+
+from app.config import get_settings
+from app.services.dispatcher import InferenceWorker
+from app.services.inference_engine import BucketedInferenceEngine
+from app.services.model_registry import get_registry
+from app.services.work_queue import open_shared_work_queue
+
+
+def main() -> None:
+    """Run a stateless inference worker against the configured work queue."""
+
+    settings = get_settings()
+    if not settings.work_queue_url:
+        raise SystemExit("WORK_QUEUE_URL must be set to run an inference worker")
+
+    registry = get_registry(settings)
+    engine = BucketedInferenceEngine(
+        registry.get_asr_session(),
+        sample_rate=settings.sample_rate,
+        bucket_seconds=settings.inference_bucket_seconds,
+    )
+    engine.warm_up()
+
+    stop = threading.Event()
+    signal.signal(signal.SIGTERM, lambda *_: stop.set())
+    signal.signal(signal.SIGINT, lambda *_: stop.set())
+
+    logger.info("Inference worker pulling from {}", settings.work_queue_url)
+    work_queue = open_shared_work_queue(settings.work_queue_url, settings.work_queue_timeout_seconds)
+    InferenceWorker(work_queue, engine.infer).run(stop)
+
+
+if __name__ == "__main__":
+    main()
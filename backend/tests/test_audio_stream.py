@@ -0,0 +1,88 @@
+import io
+import os
+import sys
+import unittest
+from pathlib import Path
+
+import av
+import numpy as np
+from starlette.datastructures import Headers, UploadFile
+
+os.environ["PARAKEET_SKIP_APP_INIT"] = "1"
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+
+from app.main import create_app
+from app.models.responses import TranscriptionResult
+from app.utils.audio_stream import decode_audio_stream, is_streamed_container
+from app.utils.audio_utils import load_audio
+
+
+def _encode(container_format: str, codec: str, seconds: float = 1.0, rate: int = 48000) -> bytes:
+    """Encode a stereo 440 Hz tone the way a browser MediaRecorder would."""
+
+    buffer = io.BytesIO()
+    with av.open(buffer, mode="w", format=container_format) as container:
+        stream = container.add_stream(codec, rate=rate, layout="stereo")
+        time = np.arange(int(seconds * rate)) / rate
+        tone = (0.5 * np.sin(2 * np.pi * 440 * time)).astype(np.float32)
+        samples = np.stack([tone, tone])
+        for start in range(0, samples.shape[1], 960):
+            frame = av.AudioFrame.from_ndarray(
+                np.ascontiguousarray(samples[:, start : start + 960]), format="fltp", layout="stereo"
+            )
+            frame.sample_rate = rate
+            for packet in stream.encode(frame):
+                container.mux(packet)
+        for packet in stream.encode(None):
+            container.mux(packet)
+    return buffer.getvalue()
+
+
+class _StreamingService:
+    def __init__(self):
+        self.received: list[np.ndarray] = []
+
+    def transcribe_stream(self, chunks, request, filename):
+        self.received.extend(chunks)
+        return TranscriptionResult(text="streamed", duration=0.0)
+
+    def transcribe_bytes(self, audio_bytes, request, filename):
+        raise AssertionError("compressed uploads must not be buffered")
+
+
+class AudioStreamTests(unittest.TestCase):
+    def test_webm_opus_decodes_to_mono_float32_chunks(self):
+        chunks = list(decode_audio_stream(io.BytesIO(_encode("webm", "libopus")), 16000))
+
+        self.assertGreater(len(chunks), 1)
+        self.assertTrue(all(chunk.ndim == 1 and chunk.dtype == np.float32 for chunk in chunks))
+        self.assertAlmostEqual(sum(len(chunk) for chunk in chunks) / 16000, 1.0, delta=0.05)
+
+    def test_load_audio_falls_back_to_libav_for_webm(self):
+        waveform, sample_rate = load_audio(_encode("webm", "libopus"), 16000)
+
+        self.assertEqual(sample_rate, 16000)
+        self.assertEqual(waveform.dtype, np.float32)
+        self.assertGreater(np.abs(waveform).max(), 0.3)
+
+    def test_streamed_container_detection(self):
+        self.assertTrue(is_streamed_container("blob", "audio/webm;codecs=opus"))
+        self.assertTrue(is_streamed_container("clip.MP3", None))
+        self.assertFalse(is_streamed_container("clip.wav", "audio/wav"))
+        self.assertFalse(is_streamed_container(None, None))
+
+
+class StreamingUploadTests(unittest.IsolatedAsyncioTestCase):
+    async def test_webm_upload_is_decoded_incrementally(self):
+        service = _StreamingService()
+        app = create_app(service=service)
+        route = next(r for r in app.routes if getattr(r, "path", None) == "/api/pipecat/transcriptions")
+        upload = UploadFile(
+            filename="recording.webm",
+            file=io.BytesIO(_encode("webm", "libopus")),
+            headers=Headers({"content-type": "audio/webm"}),
+        )
+
+        await route.endpoint(file=upload, payload=None)
+
+        self.assertGreater(len(service.received), 1)
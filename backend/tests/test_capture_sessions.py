@@ -0,0 +1,238 @@
+import os
+import sys
+import threading
+import time
+import unittest
+from pathlib import Path
+
+import numpy as np
+
+os.environ["PARAKEET_SKIP_APP_INIT"] = "1"
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+
+from app.config import Settings
+from app.main import create_app
+from app.models.pipecat import HotkeyEvent
+from app.models.responses import TranscriptSegment, TranscriptionResult
+from app.services.capture_sessions import (
+    CaptureSessionClosedError,
+    CaptureSessionLimitError,
+    CaptureSessionManager,
+)
+from app.services.vad import SileroVAD
+
+SAMPLE_RATE = 16000
+
+
+class _EnergySession:
+    """VAD model stand-in scoring a window as speech when most of its samples are loud."""
+
+    def __init__(self):
+        self.runs = 0
+
+    def run(self, output_names, inputs):
+        self.runs += 1
+        loud = np.mean(np.abs(inputs["input"]) > 0.1)
+        return [np.array([[float(loud > 0.5)]], dtype=np.float32)]
+
+
+class _EnergyVAD(SileroVAD):
+    def __init__(self, settings=None):
+        self.settings = settings or Settings()
+        self.session = _EnergySession()
+
+
+class _RecordingService:
+    """Stand-in that records every waveform handed to ASR."""
+
+    def __init__(self):
+        self.vad = _EnergyVAD()
+        self.warmed = 0
+        self.inferred: list[int] = []
+
+    def warm_up(self):
+        self.warmed += 1
+
+    def transcribe_segments(self, waveform, sample_rate, request=None, offset=0.0):
+        self.inferred.append(len(waveform))
+        end = offset + len(waveform) / sample_rate
+        return [TranscriptSegment(text=f"utterance{len(self.inferred)}", start=offset, end=end)]
+
+    def build_result(self, text_segments, duration, request=None):
+        return TranscriptionResult(
+            request_id=request.request_id,
+            text=" ".join(segment.text for segment in text_segments),
+            duration=duration,
+            segments=text_segments,
+        )
+
+
+def _speech(seconds):
+    return np.full(int(seconds * SAMPLE_RATE), 0.5, dtype=np.float32)
+
+
+def _silence(seconds):
+    return np.zeros(int(seconds * SAMPLE_RATE), dtype=np.float32)
+
+
+class CaptureSessionTests(unittest.TestCase):
+    def setUp(self):
+        self.settings = Settings(capture_buffer_seconds=1.0)
+        self.service = _RecordingService()
+        self.manager = CaptureSessionManager(self.service, settings=self.settings)
+
+    def assertInferredSeconds(self, expected):
+        """VAD segment edges snap to its analysis windows, so allow one window of slack."""
+
+        self.assertEqual(len(self.service.inferred), len(expected))
+        for samples, seconds in zip(self.service.inferred, expected):
+            self.assertAlmostEqual(samples / SAMPLE_RATE, seconds, delta=SileroVAD.window / SAMPLE_RATE)
+
+    def test_finished_utterances_are_transcribed_while_capturing(self):
+        session = self.manager.open("req-1")
+        session.push(_speech(1.0))
+        session.push(_silence(1.0))
+
+        self.assertInferredSeconds([1.0])
+
+        session.push(_speech(0.5))
+        result = self.manager.close("req-1")
+
+        self.assertInferredSeconds([1.0, 0.5])
+        self.assertEqual(result.text, "utterance1 utterance2")
+        self.assertAlmostEqual(result.duration, sum(self.service.inferred) / SAMPLE_RATE)
+        self.assertNotIn("req-1", self.manager)
+
+    def test_silent_tail_is_dropped_after_committed_speech(self):
+        session = self.manager.open("req-1")
+        session.push(_speech(1.0))
+        session.push(_silence(1.0))
+        session.push(_silence(0.3))
+        result = self.manager.close("req-1")
+
+        self.assertInferredSeconds([1.0])
+        self.assertEqual(result.text, "utterance1")
+
+    def test_silent_capture_is_transcribed_whole_like_batch_uploads(self):
+        session = self.manager.open("req-1")
+        session.push(_silence(0.3))
+        self.manager.close("req-1")
+
+        self.assertEqual(self.service.inferred, [int(0.3 * SAMPLE_RATE)])
+
+    def test_vad_scores_each_stride_once_while_streaming(self):
+        session = self.manager.open("req-1")
+        pushed = 0
+        for _ in range(20):
+            utterance = np.concatenate([_speech(2.0), _silence(1.0)])
+            for chunk in np.array_split(utterance, len(utterance) // 320):
+                session.push(chunk)
+            pushed += len(utterance)
+        self.manager.close("req-1")
+
+        self.assertEqual(len(self.service.inferred), 20)
+        self.assertLessEqual(self.service.vad.session.runs, pushed // SileroVAD.stride)
+
+    def test_open_is_idempotent_and_warms_once_per_session(self):
+        first = self.manager.open("req-1")
+        second = self.manager.open("req-1")
+
+        self.assertIs(first, second)
+        self.assertEqual(self.service.warmed, 1)
+        self.assertIsNone(self.manager.close("unknown"))
+
+    def test_buffer_grows_past_preallocated_capacity(self):
+        session = self.manager.open("req-1")
+        for _ in range(6):
+            session.push(_speech(0.5))
+
+        self.assertAlmostEqual(session.received_seconds, 3.0)
+        self.manager.close("req-1")
+        self.assertEqual(self.service.inferred, [3 * SAMPLE_RATE])
+
+
+class HotkeyCaptureTests(unittest.IsolatedAsyncioTestCase):
+    async def test_hotkey_toggle_opens_and_closes_session(self):
+        service = _RecordingService()
+        app = create_app(settings=Settings(), service=service)
+        route = next(r for r in app.routes if getattr(r, "path", None) == "/api/pipecat/events/hotkey")
+
+        await route.endpoint(HotkeyEvent(hotkey="Ctrl+Shift+Space", state="register"))
+        opened = await route.endpoint(
+            HotkeyEvent(hotkey="Ctrl+Shift+Space", state="toggle", request_id="dictation")
+        )
+        closed = await route.endpoint(
+            HotkeyEvent(hotkey="Ctrl+Shift+Space", state="toggle", request_id="dictation")
+        )
+
+        self.assertEqual(opened.request_id, "dictation")
+        self.assertIsNone(opened.transcript)
+        self.assertEqual(closed.transcript.request_id, "dictation")
+        self.assertEqual(service.warmed, 1)
+
+    async def test_hotkey_start_reports_session_limit_as_not_registered(self):
+        app = create_app(settings=Settings(capture_max_sessions=1), service=_RecordingService())
+        route = next(r for r in app.routes if getattr(r, "path", None) == "/api/pipecat/events/hotkey")
+        await route.endpoint(HotkeyEvent(hotkey="Ctrl+Shift+Space", state="register"))
+
+        first = await route.endpoint(HotkeyEvent(hotkey="Ctrl+Shift+Space", state="start", request_id="a"))
+        second = await route.endpoint(HotkeyEvent(hotkey="Ctrl+Shift+Space", state="start", request_id="b"))
+
+        self.assertTrue(first.registered)
+        self.assertFalse(second.registered)
+        self.assertIn("Too many open capture sessions", second.reason)
+
+
+class CaptureSessionLifecycleTests(unittest.TestCase):
+    def test_push_after_finish_is_rejected(self):
+        manager = CaptureSessionManager(_RecordingService(), settings=Settings())
+        session = manager.open("req-1")
+        manager.close("req-1")
+
+        with self.assertRaises(CaptureSessionClosedError):
+            session.push(_speech(0.1))
+
+    def test_idle_sessions_are_dropped(self):
+        manager = CaptureSessionManager(
+            _RecordingService(), settings=Settings(capture_idle_timeout_seconds=0.01)
+        )
+        manager.open("req-1")
+        time.sleep(0.05)
+
+        self.assertNotIn("req-1", manager)
+        self.assertIsNone(manager.close("req-1"))
+
+    def test_warm_up_does_not_block_live_sessions(self):
+        service = _RecordingService()
+        manager = CaptureSessionManager(service, settings=Settings())
+        live = manager.open("live")
+        warming, release = threading.Event(), threading.Event()
+
+        def slow_warm_up():
+            warming.set()
+            release.wait(5)
+
+        service.warm_up = slow_warm_up
+        opener = threading.Thread(target=manager.open, args=("new",))
+        opener.start()
+        self.addCleanup(opener.join)
+        self.addCleanup(release.set)
+        warming.wait(5)
+
+        started = time.monotonic()
+        self.assertIs(manager.get("live"), live)
+        self.assertIsNotNone(manager.close("live"))
+        self.assertLess(time.monotonic() - started, 1.0)
+        release.set()
+        opener.join()
+        self.assertIn("new", manager)
+
+    def test_open_sessions_are_capped(self):
+        manager = CaptureSessionManager(_RecordingService(), settings=Settings(capture_max_sessions=2))
+        manager.open("req-1")
+        manager.open("req-2")
+
+        with self.assertRaises(CaptureSessionLimitError):
+            manager.open("req-3")
+        manager.close("req-1")
+        manager.open("req-3")
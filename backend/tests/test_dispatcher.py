@@ -0,0 +1,342 @@
+import socket
+import socketserver
+import sqlite3
+import sys
+import tempfile
+import threading
+import time
+import unittest
+from collections import defaultdict, deque
+from pathlib import Path
+
+import numpy as np
+
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+
+from app.services.dispatcher import InferenceWorker, SegmentDispatcher
+from app.services.work_queue import (
+    InProcessWorkQueue,
+    RedisWorkQueue,
+    SQLiteWorkQueue,
+    open_shared_work_queue,
+    open_work_queue,
+)
+
+
+class _RespStandIn(socketserver.ThreadingTCPServer):
+    """Just enough of a Redis server (lists, strings, expiry) to exercise the queue client."""
+
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self):
+        super().__init__(("127.0.0.1", 0), _RespHandler)
+        self.lists = defaultdict(deque)
+        self.strings = {}
+        self.expires = {}
+        self.clients = []
+        self.changed = threading.Condition()
+
+    def drop_clients(self):
+        """Close every client connection, as a Redis restart would."""
+
+        for client in self.clients:
+            client.shutdown(socket.SHUT_RDWR)
+        self.clients.clear()
+
+    def alive(self, key):
+        if key in self.expires and self.expires[key] <= time.monotonic():
+            self.expires.pop(key)
+            self.strings.pop(key, None)
+            self.lists.pop(key, None)
+        return key in self.strings or bool(self.lists.get(key))
+
+
+class _RespHandler(socketserver.StreamRequestHandler):
+    def _read_command(self):
+        header = self.rfile.readline()
+        if not header:
+            return None
+        args = []
+        for _ in range(int(header[1:])):
+            length = int(self.rfile.readline()[1:])
+            args.append(self.rfile.read(length + 2)[:-2])
+        return args
+
+    def _bulk(self, value):
+        if value is None:
+            return b"$-1\r\n"
+        return b"$%d\r\n%s\r\n" % (len(value), value)
+
+    def _execute(self, server, name, args):
+        if name in (b"RPUSH", b"LPUSH"):
+            values = server.lists[args[0]]
+            if name == b"RPUSH":
+                values.extend(args[1:])
+            else:
+                values.extendleft(args[1:])
+            server.changed.notify_all()
+            return b":%d\r\n" % len(values)
+        if name in (b"BLPOP", b"BRPOPLPUSH"):
+            key = args[0]
+            server.changed.wait_for(lambda: server.lists[key], timeout=float(args[-1]))
+            if not server.lists[key]:
+                return b"*-1\r\n" if name == b"BLPOP" else b"$-1\r\n"
+            if name == b"BLPOP":
+                return b"*2\r\n" + self._bulk(key) + self._bulk(server.lists[key].popleft())
+            value = server.lists[key].pop()
+            server.lists[args[1]].appendleft(value)
+            return self._bulk(value)
+        if name == b"LRANGE":
+            values = list(server.lists[args[0]])
+            return b"*%d\r\n" % len(values) + b"".join(self._bulk(value) for value in values)
+        if name == b"LREM":
+            values = server.lists[args[0]]
+            if args[2] in values:
+                values.remove(args[2])
+                return b":1\r\n"
+            return b":0\r\n"
+        if name == b"SET":
+            server.strings[args[0]] = args[1]
+            server.expires.pop(args[0], None)
+            if len(args) == 4:
+                scale = 1.0 if args[2].upper() == b"EX" else 0.001
+                server.expires[args[0]] = time.monotonic() + int(args[3]) * scale
+            return b"+OK\r\n"
+        if name == b"GET":
+            return self._bulk(server.strings.get(args[0]) if server.alive(args[0]) else None)
+        if name == b"EXISTS":
+            return b":%d\r\n" % server.alive(args[0])
+        if name == b"DEL":
+            removed = 0
+            for key in args:
+                if server.alive(key):
+                    removed += 1
+                server.strings.pop(key, None)
+                server.lists.pop(key, None)
+                server.expires.pop(key, None)
+            return b":%d\r\n" % removed
+        if name == b"EXPIRE":
+            return b":1\r\n"
+        return b"-ERR unknown command\r\n"
+
+    def handle(self):
+        server = self.server
+        server.clients.append(self.connection)
+        while (command := self._read_command()) is not None:
+            with server.changed:
+                reply = self._execute(server, command[0].upper(), command[1:])
+            self.wfile.write(reply)
+
+
+def _length_model(waveform):
+    return [len(waveform), int(waveform[0])]
+
+
+class DispatcherTests(unittest.TestCase):
+    def _run_fleet(self, work_queue, workers=3, infer=_length_model):
+        stop = threading.Event()
+        threads = [
+            threading.Thread(
+                target=InferenceWorker(work_queue, infer, poll_timeout=0.05).run,
+                args=(stop,),
+                daemon=True,
+            )
+            for _ in range(workers)
+        ]
+        for thread in threads:
+            thread.start()
+        self.addCleanup(lambda: [thread.join() for thread in threads])
+        self.addCleanup(stop.set)
+
+    def _assert_ordered_results(self, work_queue):
+        segments = [np.full(100 + index, index, dtype=np.float32) for index in range(12)]
+
+        token_ids = SegmentDispatcher(work_queue, timeout=5.0).map(segments)
+
+        self.assertEqual([ids.tolist() for ids in token_ids], [[100 + i, i] for i in range(12)])
+
+    def test_in_process_queue_preserves_segment_order(self):
+        work_queue = InProcessWorkQueue()
+        self._run_fleet(work_queue)
+
+        self._assert_ordered_results(work_queue)
+
+    def test_sqlite_queue_preserves_segment_order(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        work_queue = open_work_queue(f"sqlite:///{directory.name}/queue.db")
+        self.assertIsInstance(work_queue, SQLiteWorkQueue)
+        self._run_fleet(work_queue)
+
+        self._assert_ordered_results(work_queue)
+
+    def _redis_stand_in(self):
+        server = _RespStandIn()
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        self.addCleanup(server.server_close)
+        self.addCleanup(server.shutdown)
+        return server
+
+    def test_redis_queue_against_stand_in(self):
+        server = self._redis_stand_in()
+        work_queue = open_work_queue(f"redis://127.0.0.1:{server.server_address[1]}/0")
+        self.assertIsInstance(work_queue, RedisWorkQueue)
+        self._run_fleet(work_queue)
+
+        self._assert_ordered_results(work_queue)
+        deadline = time.monotonic() + 1.0
+        while server.lists[b"parakeet:processing"] and time.monotonic() < deadline:
+            time.sleep(0.01)
+        self.assertFalse(server.lists[b"parakeet:processing"])
+
+    def test_redis_requeues_tasks_from_stalled_workers(self):
+        server = self._redis_stand_in()
+        work_queue = RedisWorkQueue(
+            "127.0.0.1", server.server_address[1], visibility_timeout=0.05, lease_grace=0.05
+        )
+        work_queue.submit("job", b"payload")
+
+        self.assertEqual(work_queue.claim(timeout=0), ("job", b"payload"))
+        self.assertIsNone(work_queue.claim(timeout=0))
+        time.sleep(0.1)
+        self.assertIsNone(work_queue.claim(timeout=0))
+        time.sleep(0.1)
+        self.assertEqual(work_queue.claim(timeout=0), ("job", b"payload"))
+        work_queue.complete("job", b"result")
+
+        self.assertEqual(work_queue.wait_result("job", timeout=1.0), b"result")
+        self.assertFalse(server.lists[b"parakeet:processing"])
+
+    def test_redis_does_not_requeue_a_claim_before_its_lease_is_set(self):
+        server = self._redis_stand_in()
+        work_queue = RedisWorkQueue("127.0.0.1", server.server_address[1], lease_grace=0.05)
+        work_queue.submit("job", b"payload")
+        # Another worker has moved the id but not yet taken its lease.
+        server.lists[b"parakeet:processing"].append(server.lists[b"parakeet:tasks"].pop())
+
+        self.assertIsNone(work_queue.claim(timeout=0))
+        server.strings[b"parakeet:lease:job"] = b"1"
+        time.sleep(0.1)
+
+        self.assertIsNone(work_queue.claim(timeout=0))
+        self.assertEqual(list(server.lists[b"parakeet:processing"]), [b"job"])
+
+    def test_redis_reconnects_after_connection_loss(self):
+        server = self._redis_stand_in()
+        work_queue = RedisWorkQueue("127.0.0.1", server.server_address[1])
+        work_queue.submit("job", b"payload")
+        server.drop_clients()
+
+        with self.assertRaises((ConnectionError, OSError)):
+            work_queue.claim(timeout=0)
+        self.assertEqual(work_queue.claim(timeout=0), ("job", b"payload"))
+
+    def test_worker_keeps_running_through_queue_errors(self):
+        class _FlakyQueue(InProcessWorkQueue):
+            failures = 2
+
+            def claim(self, timeout):
+                if self.failures:
+                    self.failures -= 1
+                    raise sqlite3.OperationalError("database is locked")
+                return super().claim(timeout)
+
+        work_queue = _FlakyQueue()
+        worker = InferenceWorker(work_queue, _length_model, poll_timeout=0.05, retry_delay=0.01)
+        stop = threading.Event()
+        thread = threading.Thread(target=worker.run, args=(stop,), daemon=True)
+        thread.start()
+        self.addCleanup(thread.join)
+        self.addCleanup(stop.set)
+
+        token_ids = SegmentDispatcher(work_queue, timeout=5.0).map([np.full(3, 7, dtype=np.float32)])
+
+        self.assertEqual(token_ids[0].tolist(), [3, 7])
+        self.assertEqual(work_queue.failures, 0)
+
+    def test_memory_urls_share_one_in_process_queue(self):
+        work_queue = open_work_queue("memory://dispatch-test")
+
+        self.assertIsInstance(work_queue, InProcessWorkQueue)
+        self.assertIs(open_work_queue("memory://dispatch-test"), work_queue)
+        self.assertIsNot(open_work_queue("memory://other"), work_queue)
+        with self.assertRaises(ValueError):
+            open_shared_work_queue("memory://dispatch-test")
+
+    def test_worker_failure_is_reported_to_dispatcher(self):
+        def broken(waveform):
+            raise ValueError("model exploded")
+
+        work_queue = InProcessWorkQueue()
+        self._run_fleet(work_queue, workers=1, infer=broken)
+
+        with self.assertRaisesRegex(RuntimeError, "model exploded"):
+            SegmentDispatcher(work_queue, timeout=5.0).map([np.zeros(10, dtype=np.float32)])
+
+    def test_sqlite_requeues_tasks_from_stalled_workers(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        work_queue = SQLiteWorkQueue(Path(directory.name) / "queue.db", visibility_timeout=0.05)
+        work_queue.submit("job", b"payload")
+
+        self.assertEqual(work_queue.claim(timeout=0), ("job", b"payload"))
+        self.assertIsNone(work_queue.claim(timeout=0))
+        time.sleep(0.1)
+        self.assertEqual(work_queue.claim(timeout=0), ("job", b"payload"))
+
+    def test_failed_map_cancels_outstanding_segments(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        server = self._redis_stand_in()
+        queues = {
+            "in-process": InProcessWorkQueue(),
+            "sqlite": SQLiteWorkQueue(Path(directory.name) / "queue.db"),
+            "redis": RedisWorkQueue("127.0.0.1", server.server_address[1]),
+        }
+        for name, work_queue in queues.items():
+            with self.subTest(name):
+                work_queue.submit("claimed", b"payload")
+                self.assertEqual(work_queue.claim(timeout=0)[0], "claimed")
+
+                with self.assertRaises(TimeoutError):
+                    SegmentDispatcher(work_queue, timeout=0.05).map([np.zeros(10, dtype=np.float32)] * 3)
+                work_queue.cancel(["claimed"])
+                work_queue.complete("claimed", b"late result")
+
+                self.assertIsNone(work_queue.claim(timeout=0))
+                self.assertIsNone(work_queue.wait_result("claimed", timeout=0))
+
+    def test_map_timeout_bounds_the_whole_request(self):
+        class _SlowQueue(InProcessWorkQueue):
+            def wait_result(self, job_id, timeout):
+                time.sleep(min(timeout, 0.1))
+                return None if timeout < 0.1 else b"\x00"
+
+        started = time.monotonic()
+        with self.assertRaises(TimeoutError):
+            SegmentDispatcher(_SlowQueue(), timeout=0.25).map([np.zeros(10, dtype=np.float32)] * 10)
+
+        self.assertLess(time.monotonic() - started, 0.6)
+
+    def test_sqlite_visibility_timeout_follows_dispatcher_timeout(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+
+        work_queue = open_work_queue(f"sqlite:///{directory.name}/queue.db", timeout=30.0)
+
+        self.assertEqual(work_queue.visibility_timeout, 15.0)
+
+    def test_sqlite_purges_uncollected_results(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        work_queue = SQLiteWorkQueue(Path(directory.name) / "queue.db", result_ttl=0.05)
+        for job_id in ("abandoned", "fresh"):
+            work_queue.submit(job_id, b"payload")
+            work_queue.claim(timeout=0)
+        work_queue.complete("abandoned", b"old")
+        time.sleep(0.1)
+        work_queue.complete("fresh", b"new")
+
+        self.assertIsNone(work_queue.wait_result("abandoned", timeout=0))
+        self.assertEqual(work_queue.wait_result("fresh", timeout=0), b"new")
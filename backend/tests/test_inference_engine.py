@@ -0,0 +1,119 @@
+import sys
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import numpy as np
+import onnxruntime as ort
+
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+
+from app.services.inference_engine import BucketedInferenceEngine
+from app.services.transcription_service import DecoderVocabulary
+
+try:
+    from onnx import TensorProto, helper, numpy_helper
+except ImportError:  # pragma: no cover - onnx is only needed to build the test graph
+    helper = None
+
+VOCAB_SIZE = 7
+FRAME_SAMPLES = 4
+
+
+def _frame_classifier(with_length: bool = True) -> ort.InferenceSession:
+    """Build a tiny CTC-like graph mapping every 4 samples to one frame of logits."""
+
+    weights = np.random.RandomState(0).randn(FRAME_SAMPLES, VOCAB_SIZE).astype(np.float32)
+    nodes = [
+        helper.make_node("Reshape", ["audio", "shape"], ["frames"]),
+        helper.make_node("MatMul", ["frames", "weights"], ["logits"]),
+    ]
+    inputs = [helper.make_tensor_value_info("audio", TensorProto.FLOAT, [1, "samples"])]
+    outputs = [helper.make_tensor_value_info("logits", TensorProto.FLOAT, [1, "frames", VOCAB_SIZE])]
+    if with_length:
+        nodes.append(helper.make_node("Identity", ["length"], ["encoded_length"]))
+        inputs.append(helper.make_tensor_value_info("length", TensorProto.INT64, [1]))
+        outputs.append(helper.make_tensor_value_info("encoded_length", TensorProto.INT64, [1]))
+    graph = helper.make_graph(
+        nodes,
+        "frame_classifier",
+        inputs,
+        outputs,
+        initializer=[
+            numpy_helper.from_array(np.array([1, -1, FRAME_SAMPLES], dtype=np.int64), "shape"),
+            numpy_helper.from_array(weights, "weights"),
+        ],
+    )
+    model = helper.make_model(graph, opset_imports=[helper.make_opsetid("", 13)])
+    model.ir_version = 8
+    return ort.InferenceSession(model.SerializeToString(), providers=["CPUExecutionProvider"])
+
+
+@unittest.skipIf(helper is None, "onnx is required to build the test model")
+class BucketedInferenceEngineTests(unittest.TestCase):
+    def setUp(self):
+        self.session = _frame_classifier()
+        self.engine = BucketedInferenceEngine(self.session, sample_rate=16000, bucket_seconds=[0.5, 1.0])
+        self.random = np.random.RandomState(1)
+
+    def _reference(self, waveform):
+        feeds = {"audio": waveform[np.newaxis, :], "length": np.array([len(waveform)], dtype=np.int64)}
+        logits = self.session.run(["logits"], feeds)[0]
+        return np.argmax(logits, axis=-1).flatten()
+
+    def test_padded_buckets_match_unpadded_inference(self):
+        for samples in (400, 8000, 12000, 16000, 24000):
+            waveform = self.random.randn(samples).astype(np.float32)
+
+            token_ids = self.engine.infer(waveform)
+
+            np.testing.assert_array_equal(token_ids, self._reference(waveform))
+
+    def test_bucket_buffers_are_reused_and_padding_is_cleared(self):
+        long_waveform = self.random.randn(7000).astype(np.float32)
+        short_waveform = self.random.randn(1000).astype(np.float32)
+
+        first = self.engine.infer(long_waveform)
+        bucket = self.engine._buckets[8000]
+        buffer = bucket.token_ids
+        token_ids = self.engine.infer(short_waveform)
+
+        self.assertIs(bucket.token_ids, buffer)
+        self.assertFalse(np.shares_memory(token_ids, buffer))
+        np.testing.assert_array_equal(first, self._reference(long_waveform))
+        np.testing.assert_array_equal(token_ids, self._reference(short_waveform))
+        self.assertFalse(bucket.audio[0, 1000:].any())
+        self.assertEqual(bucket.lengths[0], 1000)
+
+    def test_concurrent_callers_get_their_own_token_ids(self):
+        waveforms = [self.random.randn(samples).astype(np.float32) for samples in (3000, 5000, 7000, 7900)]
+        expected = [self._reference(waveform) for waveform in waveforms]
+
+        with ThreadPoolExecutor(max_workers=4) as pool:
+            results = list(pool.map(self.engine.infer, waveforms * 25))
+
+        for index, token_ids in enumerate(results):
+            np.testing.assert_array_equal(token_ids, expected[index % len(waveforms)])
+
+    def test_models_without_length_input_run_unpadded(self):
+        session = _frame_classifier(with_length=False)
+        engine = BucketedInferenceEngine(session, sample_rate=16000, bucket_seconds=[0.5, 1.0])
+        waveform = self.random.randn(1000).astype(np.float32)
+
+        token_ids = engine.infer(waveform)
+
+        self.assertFalse(engine.padded)
+        self.assertEqual(engine._buckets, {})
+        self.assertEqual(len(token_ids), 1000 // FRAME_SAMPLES)
+        logits = session.run(None, {"audio": waveform[np.newaxis, :]})[0]
+        np.testing.assert_array_equal(token_ids, np.argmax(logits, axis=-1).flatten())
+
+
+class DecoderVocabularyTests(unittest.TestCase):
+    def test_decode_collapses_repeats_and_blanks(self):
+        vocab = DecoderVocabulary(tokens=["", " he", "llo", " world", "<blank>"], blank_id=4)
+
+        text = vocab.decode(np.array([4, 1, 1, 4, 2, 2, 4, 4, 3, 4, 3]))
+
+        self.assertEqual(text, "hello world world")
+        self.assertEqual(vocab.decode([]), "")
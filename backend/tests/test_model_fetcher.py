@@ -0,0 +1,187 @@
+import hashlib
+import json
+import re
+import subprocess
+import sys
+import tempfile
+import threading
+import unittest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+
+from app.services.model_fetcher import ModelFetchError, ModelFetcher, RemoteResource
+
+PAYLOAD = bytes(range(256)) * 4000
+
+
+class _RangeHandler(BaseHTTPRequestHandler):
+    """Serve ``PAYLOAD`` with optional HTTP range support and record requested ranges."""
+
+    supports_ranges = True
+    requested_ranges: list = []
+    etag = '"v1"'
+    current_etag = '"v1"'
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_HEAD(self):
+        self.send_response(200)
+        self.send_header("Content-Length", str(len(PAYLOAD)))
+        self.send_header("ETag", self.etag)
+        if self.supports_ranges:
+            self.send_header("Accept-Ranges", "bytes")
+        self.end_headers()
+
+    def do_GET(self):
+        header = self.headers.get("Range")
+        match = re.fullmatch(r"bytes=(\d+)-(\d+)", header or "")
+        if_range = self.headers.get("If-Range")
+        fresh = if_range is None or if_range == self.current_etag
+        if self.supports_ranges and match and fresh:
+            start, end = int(match.group(1)), int(match.group(2))
+            self.requested_ranges.append((start, end))
+            body = PAYLOAD[start : end + 1]
+            self.send_response(206)
+            self.send_header("Content-Range", f"bytes {start}-{end}/{len(PAYLOAD)}")
+        else:
+            body = PAYLOAD
+            self.send_response(200)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+class ModelFetcherTests(unittest.TestCase):
+    def setUp(self):
+        _RangeHandler.supports_ranges = True
+        _RangeHandler.requested_ranges = []
+        _RangeHandler.etag = _RangeHandler.current_etag = '"v1"'
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), _RangeHandler)
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self.thread.start()
+        self.url = f"http://127.0.0.1:{self.server.server_address[1]}/model.onnx"
+        self.tmp = tempfile.TemporaryDirectory()
+        self.target = Path(self.tmp.name) / "models" / "model.onnx"
+        self.fetcher = ModelFetcher(connections=4, min_range_bytes=64 * 1024)
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.server_close()
+        self.tmp.cleanup()
+
+    def _resource(self, sha256=hashlib.sha256(PAYLOAD).hexdigest()):
+        return RemoteResource(name="model", url=self.url, path=self.target, sha256=sha256)
+
+    def test_parallel_ranges_install_verified_file(self):
+        self.fetcher.fetch(self._resource())
+
+        self.assertEqual(self.target.read_bytes(), PAYLOAD)
+        self.assertEqual(len(_RangeHandler.requested_ranges), 4)
+        self.assertEqual(self._leftovers(), [])
+
+    def _leftovers(self):
+        lock = self.target.with_name("model.onnx.lock")
+        return sorted(path for path in self.target.parent.iterdir() if path not in (self.target, lock))
+
+    def _interrupted_download(self, validator):
+        self.target.parent.mkdir(parents=True)
+        step = len(PAYLOAD) // 4
+        first_part = self.target.with_name(f"model.onnx.0-{step - 1}.part")
+        first_part.write_bytes(PAYLOAD[:100])
+        state = {"url": self.url, "size": len(PAYLOAD), "validator": validator}
+        self.target.with_name("model.onnx.parts.json").write_text(json.dumps(state))
+        return step
+
+    def test_resumes_partial_range(self):
+        step = self._interrupted_download('"v1"')
+
+        self.fetcher.fetch(self._resource())
+
+        self.assertEqual(self.target.read_bytes(), PAYLOAD)
+        self.assertIn((100, step - 1), _RangeHandler.requested_ranges)
+        self.assertEqual(self._leftovers(), [])
+
+    def test_parts_from_an_older_remote_file_are_discarded(self):
+        step = self._interrupted_download('"v0"')
+
+        self.fetcher.fetch(self._resource())
+
+        self.assertEqual(self.target.read_bytes(), PAYLOAD)
+        self.assertIn((0, step - 1), _RangeHandler.requested_ranges)
+        self.assertNotIn((100, step - 1), _RangeHandler.requested_ranges)
+
+    def test_remote_change_during_download_is_not_stitched(self):
+        _RangeHandler.current_etag = '"v2"'
+
+        with self.assertRaisesRegex(ModelFetchError, "changed on the server"):
+            self.fetcher.fetch(self._resource(sha256=None))
+
+        self.assertFalse(self.target.exists())
+        self.assertEqual(
+            [path.name for path in self._leftovers()], ["model.onnx.parts.json"]
+        )
+
+    def test_concurrent_fetchers_install_one_download(self):
+        errors = []
+
+        def fetch():
+            try:
+                ModelFetcher(connections=4, min_range_bytes=64 * 1024).fetch(self._resource())
+            except Exception as exc:  # pragma: no cover - reported below
+                errors.append(exc)
+
+        threads = [threading.Thread(target=fetch) for _ in range(3)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(errors, [])
+        self.assertEqual(self.target.read_bytes(), PAYLOAD)
+        self.assertEqual(len(_RangeHandler.requested_ranges), 4)
+        self.assertEqual(self._leftovers(), [])
+
+    @unittest.skipIf(sys.platform == "win32", "file locks are process-local on Windows")
+    def test_concurrent_processes_install_one_download(self):
+        script = (
+            "import sys; from pathlib import Path;"
+            "from app.services.model_fetcher import ModelFetcher, RemoteResource;"
+            "ModelFetcher(connections=4, min_range_bytes=64 * 1024).fetch("
+            "RemoteResource('model', sys.argv[1], Path(sys.argv[2]), sys.argv[3]))"
+        )
+        backend = Path(__file__).resolve().parents[1]
+        digest = hashlib.sha256(PAYLOAD).hexdigest()
+        processes = [
+            subprocess.Popen([sys.executable, "-c", script, self.url, str(self.target), digest], cwd=backend)
+            for _ in range(3)
+        ]
+
+        self.assertEqual([process.wait(timeout=60) for process in processes], [0, 0, 0])
+        self.assertEqual(self.target.read_bytes(), PAYLOAD)
+        self.assertEqual(len(_RangeHandler.requested_ranges), 4)
+        self.assertEqual(self._leftovers(), [])
+
+    def test_checksum_mismatch_leaves_no_file(self):
+        with self.assertRaises(ModelFetchError):
+            self.fetcher.fetch(self._resource(sha256="0" * 64))
+
+        self.assertEqual(self._leftovers(), [])
+
+    def test_falls_back_to_single_stream_without_range_support(self):
+        _RangeHandler.supports_ranges = False
+
+        paths = self.fetcher.fetch_all([self._resource()])
+
+        self.assertEqual(paths, [self.target])
+        self.assertEqual(self.target.read_bytes(), PAYLOAD)
+
+    def test_existing_file_with_wrong_checksum_is_replaced(self):
+        self.target.parent.mkdir(parents=True)
+        self.target.write_bytes(PAYLOAD[:10])
+
+        self.fetcher.fetch(self._resource())
+
+        self.assertEqual(self.target.read_bytes(), PAYLOAD)
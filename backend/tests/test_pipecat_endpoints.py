@@ -21,6 +21,9 @@ class _StubTranscriptionService:
     def __init__(self):
         self.calls: list[tuple[bytes, dict, str]] = []
 
+    def warm_up(self):
+        pass
+
     def transcribe_bytes(self, audio_bytes: bytes, request, filename: str):
         self.calls.append((audio_bytes, request.dict(), filename))
         return TranscriptionResult(
@@ -86,9 +89,10 @@ class PipecatEndpointTests(unittest.IsolatedAsyncioTestCase):
         audio_file = UploadFile(filename="audio.wav", file=io.BytesIO(b"123"))
         route = next(r for r in self.app.routes if getattr(r, "path", None) == "/api/pipecat/transcriptions")
 
-        response: TranscriptionResult = await route.endpoint(file=audio_file, payload=json.dumps(payload))
+        response = await route.endpoint(file=audio_file, payload=json.dumps(payload))
 
-        self.assertEqual(response.text, "Stub transcript")
+        self.assertEqual(response.media_type, "application/json")
+        self.assertEqual(json.loads(response.body)["text"], "Stub transcript")
         self.assertEqual(len(self.service.calls), 1)
         audio_bytes, request_body, filename = self.service.calls[0]
         self.assertEqual(audio_bytes, b"123")
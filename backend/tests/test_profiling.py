@@ -0,0 +1,152 @@
+import json
+import sys
+import tempfile
+import threading
+import time
+import unittest
+import zipfile
+from pathlib import Path
+from types import SimpleNamespace
+
+import numpy as np
+import onnxruntime as ort
+
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+
+from app.config import Settings
+from app.services.inference_engine import BucketedInferenceEngine
+from app.services.profiling import ProfilingBusyError, ProfilingController
+from app.services.transcription_service import DecoderVocabulary
+
+try:
+    from onnx import TensorProto, helper, numpy_helper
+except ImportError:  # pragma: no cover - onnx is only needed to build the test graph
+    helper = None
+
+
+def _frame_classifier_bytes() -> bytes:
+    weights = np.random.RandomState(0).randn(4, 5).astype(np.float32)
+    graph = helper.make_graph(
+        [
+            helper.make_node("Reshape", ["audio", "shape"], ["frames"]),
+            helper.make_node("MatMul", ["frames", "weights"], ["logits"]),
+        ],
+        "frame_classifier",
+        [helper.make_tensor_value_info("audio", TensorProto.FLOAT, [1, "samples"])],
+        [helper.make_tensor_value_info("logits", TensorProto.FLOAT, [1, "frames", 5])],
+        initializer=[
+            numpy_helper.from_array(np.array([1, -1, 4], dtype=np.int64), "shape"),
+            numpy_helper.from_array(weights, "weights"),
+        ],
+    )
+    model = helper.make_model(graph, opset_imports=[helper.make_opsetid("", 13)])
+    model.ir_version = 8
+    return model.SerializeToString()
+
+
+class ProfilingControllerTests(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.settings = Settings(profiling_dir=Path(self.tmp.name), inference_bucket_seconds=[0.5])
+
+    def _summary(self, controller, status):
+        self.assertEqual(status.state, "complete")
+        self.assertTrue(status.artifact_url.endswith(f"/{status.capture_id}/artifact"))
+        with zipfile.ZipFile(controller.artifact_path(status.capture_id)) as archive:
+            return json.loads(archive.read(f"{status.capture_id}/summary.json"))
+
+    def test_inactive_controller_runs_function_directly(self):
+        controller = ProfilingController(SimpleNamespace(), settings=self.settings)
+
+        self.assertFalse(controller.active)
+        self.assertEqual(controller.call("noop", lambda value: value * 2, 21), 42)
+        self.assertEqual(controller.status().state, "idle")
+
+    def test_python_stages_are_captured_for_next_requests(self):
+        vocab = DecoderVocabulary(tokens=["", "a", "b"], blank_id=0)
+        controller = ProfilingController(SimpleNamespace(), settings=self.settings)
+        controller.start(requests=2)
+
+        with self.assertRaises(ProfilingBusyError):
+            controller.start(requests=1)
+        for _ in range(2):
+            self.assertEqual(controller.call("decode", vocab.decode, [1, 1, 0, 2]), "ab")
+
+        summary = self._summary(controller, controller.status())
+        self.assertFalse(controller.active)
+        self.assertEqual([request["label"] for request in summary["requests"]], ["decode", "decode"])
+        self.assertIn("ctc_decode", summary["requests"][0]["python_stage_seconds"])
+
+    def test_status_does_not_wait_for_a_profiled_request(self):
+        controller = ProfilingController(SimpleNamespace(), settings=self.settings)
+        controller.start(requests=1)
+        entered, release = threading.Event(), threading.Event()
+
+        def slow_request():
+            entered.set()
+            release.wait(5)
+
+        worker = threading.Thread(target=controller.call, args=("slow", slow_request))
+        worker.start()
+        self.addCleanup(worker.join)
+        self.addCleanup(release.set)
+        entered.wait(5)
+
+        started = time.monotonic()
+        status = controller.status()
+
+        self.assertLess(time.monotonic() - started, 1.0)
+        self.assertEqual(status.state, "recording")
+        release.set()
+        worker.join()
+        self.assertEqual(controller.status().state, "complete")
+
+    def test_time_window_expires_without_requests(self):
+        controller = ProfilingController(SimpleNamespace(), settings=self.settings)
+        controller.start(seconds=0.01)
+        time.sleep(0.05)
+
+        summary = self._summary(controller, controller.status())
+
+        self.assertEqual(summary["requests"], [])
+
+    @unittest.skipIf(helper is None, "onnx is required to build the test model")
+    def test_ort_operator_timings_are_split_per_request(self):
+        model = _frame_classifier_bytes()
+        engine = BucketedInferenceEngine(
+            ort.InferenceSession(model, providers=["CPUExecutionProvider"]), 16000, [0.5]
+        )
+        service = SimpleNamespace(engine=engine, vad=None)
+        controller = ProfilingController(
+            service,
+            settings=self.settings,
+            session_factories={
+                "asr": lambda options: ort.InferenceSession(
+                    model, options, providers=["CPUExecutionProvider"]
+                )
+            },
+        )
+
+        def transcribe(segments):
+            for _ in range(segments):
+                service.engine.infer(np.ones(4000, dtype=np.float32))
+
+        def transcribe_beside_capture(segments):
+            # A capture session pushing audio on another thread mid-request.
+            other = threading.Thread(target=transcribe, args=(2,))
+            other.start()
+            other.join()
+            transcribe(segments)
+
+        controller.start(requests=2)
+        controller.call("first", transcribe, 1)
+        controller.call("second", transcribe_beside_capture, 3)
+
+        summary = self._summary(controller, controller.status())
+        first, second = summary["requests"]
+        self.assertIs(service.engine, engine)
+        self.assertEqual(first["ort_runs"], {"asr": 1})
+        self.assertEqual(second["ort_runs"], {"asr": 3})
+        self.assertIn("MatMul", second["ort_operator_ms"]["asr"])
+        self.assertGreater(second["python_stage_seconds"]["asr_inference"], 0.0)
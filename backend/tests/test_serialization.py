@@ -0,0 +1,73 @@
+import json
+import sys
+import unittest
+from pathlib import Path
+
+import msgpack
+
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+
+from app.models.responses import TranscriptSegment, TranscriptionResult
+from app.utils.serialization import (
+    COLUMNAR_MEDIA_TYPE,
+    JSON_MEDIA_TYPE,
+    MSGPACK_MEDIA_TYPE,
+    negotiate_media_type,
+    render_transcription,
+)
+
+
+def _result() -> TranscriptionResult:
+    return TranscriptionResult(
+        request_id="abc",
+        text="Hello there. General Kenobi.",
+        duration=2.5,
+        segments=[
+            TranscriptSegment(text="Hello there.", start=0.0, end=1.0),
+            TranscriptSegment(text="General Kenobi.", start=1.0, end=2.5, speaker="SPEAKER_1"),
+        ],
+        settings_applied={"model": "parakeet_v3"},
+    )
+
+
+class SerializationTests(unittest.TestCase):
+    def test_default_json_matches_pydantic_shape(self):
+        result = _result()
+
+        response = render_transcription(result)
+
+        self.assertEqual(response.media_type, JSON_MEDIA_TYPE)
+        self.assertEqual(json.loads(response.body), json.loads(result.json()))
+
+    def test_columnar_json_groups_segment_fields(self):
+        response = render_transcription(_result(), COLUMNAR_MEDIA_TYPE)
+
+        body = json.loads(response.body)
+        self.assertEqual(response.media_type, COLUMNAR_MEDIA_TYPE)
+        self.assertEqual(body["segments"]["start"], [0.0, 1.0])
+        self.assertEqual(body["segments"]["end"], [1.0, 2.5])
+        self.assertEqual(body["segments"]["speaker"], [None, "SPEAKER_1"])
+        self.assertEqual(body["text"], "Hello there. General Kenobi.")
+
+    def test_msgpack_round_trip(self):
+        result = _result()
+
+        response = render_transcription(result, "application/x-msgpack")
+
+        body = msgpack.unpackb(response.body)
+        self.assertEqual(response.media_type, MSGPACK_MEDIA_TYPE)
+        self.assertEqual(body["segments"]["text"], ["Hello there.", "General Kenobi."])
+        self.assertEqual(body["created_at"], result.created_at.isoformat())
+
+    def test_negotiation_honours_quality_and_falls_back_to_json(self):
+        self.assertEqual(negotiate_media_type(None), JSON_MEDIA_TYPE)
+        self.assertEqual(negotiate_media_type("*/*"), JSON_MEDIA_TYPE)
+        self.assertEqual(negotiate_media_type("text/html"), JSON_MEDIA_TYPE)
+        self.assertEqual(
+            negotiate_media_type(f"application/json;q=0.5, {MSGPACK_MEDIA_TYPE}"),
+            MSGPACK_MEDIA_TYPE,
+        )
+        self.assertEqual(
+            negotiate_media_type(f"{COLUMNAR_MEDIA_TYPE};q=0, application/json"),
+            JSON_MEDIA_TYPE,
+        )
@@ -19,6 +19,7 @@ export interface PipecatOptions {
   output_devices: DeviceOption[];
   default_hotkey: string;
   upload_endpoint: string;
+  capture_endpoint: string;
 }
 
 export interface TranscriptionSettings {
@@ -60,12 +61,15 @@ export interface HotkeyEvent {
   hotkey: string;
   state: string;
   request_id?: string;
+  settings?: TranscriptionSettings;
 }
 
 export interface HotkeyRegistration {
   hotkey: string;
   registered: boolean;
   reason?: string | null;
+  request_id?: string | null;
+  transcript?: TranscriptionResponse | null;
 }
 
 const api = axios.create({